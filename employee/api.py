@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import re
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+from app import (create_app, db, User, Letter, ArchivedLetter, Author, Officer, LETTER_TYPES, LETTER_TRANSITIONS, letter_queue,
+                 letter_rows, page_statement, page_result, review_letters, review_users, submit_letter)
+
+# Serve with an ASGI server, e.g. `uvicorn api:application`; /api/v1 runs here, every other path goes to the Flask app
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+MAX_BODY = 1024 * 1024
+app = create_app()
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+
+
+class ApiRequest:
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope['headers']}
+        self.body = body
+
+    def json(self):
+        try:
+            payload = json.loads(self.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Request body is not valid JSON')
+        if not isinstance(payload, dict):
+            raise ApiError(400, 'Request body must be a JSON object')
+        return payload
+
+
+def async_database_url():
+    with app.app_context():
+        url = db.engine.url
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def parse_ids(raw):
+    if isinstance(raw, str):
+        raw = [value for value in raw.split(',') if value]
+    if not isinstance(raw, list):
+        raise ApiError(400, 'ids must be a list')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw))
+    except (TypeError, ValueError):
+        raise ApiError(400, 'ids must be integers')
+    if len(ids) > app.config['BULK_MAX_IDS']:
+        raise ApiError(400, f"At most {app.config['BULK_MAX_IDS']} ids per request")
+    return ids
+
+
+def session_user_id(cookie):
+    # Same cookie and session store as the HTML views, so a browser login works here too
+    session = app.session_interface.open_session(app, Request(EnvironBuilder(headers={'Cookie': cookie}).get_environ()))
+    return session.get('_user_id') if session is not None else None
+
+
+def in_app_context(fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def submit_letter_id(user, letter_type):
+    return submit_letter(user, letter_type).id
+
+
+def user_summary(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'full_name': user.full_name,
+        'designation': user.designation,
+        'role': user.role,
+        'approved': user.approved,
+    }
+
+
+def letter_summary(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'author': row.author,
+        'officer': row.officer,
+        'status': row.status,
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat(),
+        'head_remark': row.head_remark,
+    }
+
+
+def letter_detail(letter, author, officer, user):
+    # Authors only see the officer's remark once it explains a rejection, as on view_letter
+    show_officer_remark = user.role != 'user' or letter.status == 'officer_rejected'
+    return {
+        'id': letter.id,
+        'title': letter.title,
+        'author': author,
+        'officer': officer,
+        'status': letter.status,
+        'created_at': letter.created_at.isoformat(),
+        'updated_at': letter.updated_at.isoformat(),
+        'body': letter.body,
+        'officer_remark': letter.officer_remark if show_officer_remark else None,
+        'head_remark': letter.head_remark,
+    }
+
+
+def letter_details(model=Letter):
+    return (
+        db.select(model, Author.full_name, Officer.full_name)
+        .join(Author, model.user_id == Author.id)
+        .outerjoin(Officer, model.officer_id == Officer.id)
+    )
+
+
+class API:
+    routes = [
+        ('GET', re.compile(r'/api/v1/me'), 'me'),
+        ('GET', re.compile(r'/api/v1/letters'), 'list_letters'),
+        ('POST', re.compile(r'/api/v1/letters'), 'create_letter'),
+        ('GET', re.compile(r'/api/v1/letters/(?P<letter_id>\d+)'), 'get_letter'),
+        ('POST', re.compile(r'/api/v1/letters/(?P<action>approve|reject)'), 'review_letters'),
+        ('GET', re.compile(r'/api/v1/users/pending'), 'pending_users'),
+        ('POST', re.compile(r'/api/v1/users/(?P<action>approve|reject)'), 'review_users'),
+    ]
+
+    def __init__(self, flask_app):
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = create_async_engine(async_database_url(), pool_pre_ping=True)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine.sync_engine, 'connect', self.tune_sqlite)
+
+    def tune_sqlite(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in app.config['SQLITE_PRAGMAS']:
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'].startswith('/api/v1/'):
+            await self.handle(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY:
+                raise ApiError(413, 'Request body too large')
+            if not message.get('more_body'):
+                return body
+
+    async def handle(self, scope, receive, send):
+        request = None
+        try:
+            request = ApiRequest(scope, await self.read_body(receive))
+            handler, params = self.route(request)
+            # Queries are built with the same helpers as the views, which read the app's config
+            with app.app_context():
+                async with self.sessions() as session:
+                    user = await self.authenticate(session, request)
+                    status, payload = await handler(session, request, user, **params)
+        except ApiError as error:
+            status, payload = error.status, {'error': error.message}
+        await self.respond(send, request, status, payload)
+
+    def route(self, request):
+        allowed = False
+        for method, pattern, name in self.routes:
+            match = pattern.fullmatch(request.path)
+            if match:
+                if method == request.method:
+                    return getattr(self, name), match.groupdict()
+                allowed = True
+        raise ApiError(405 if allowed else 404, 'Method not allowed' if allowed else 'Not found')
+
+    async def authenticate(self, session, request):
+        user_id = await asyncio.to_thread(session_user_id, request.headers.get('cookie', ''))
+        user = await session.get(User, int(user_id)) if user_id else None
+        if user is None:
+            raise ApiError(401, 'Login required')
+        return user
+
+    async def respond(self, send, request, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'cache-control', b'private, no-cache'),
+            (b'vary', b'Cookie'),
+        ]
+        if request is not None and request.method == 'GET' and status == 200:
+            # Strong ETag over the exact bytes, so an unchanged batch or page revalidates to a bodiless 304
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            headers.append((b'etag', etag.encode()))
+            if etag in [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]:
+                status, body = 304, b''
+        headers.append((b'content-length', str(len(body)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def require_role(self, user, *roles):
+        if user.role not in roles:
+            raise ApiError(403, 'Not allowed for your role')
+
+    async def me(self, session, request, user):
+        return 200, user_summary(user)
+
+    async def list_letters(self, session, request, user):
+        if 'ids' in request.query:
+            # Batched read: one query per table for up to BULK_MAX_IDS letters; ids you cannot see come back as missing
+            ids = parse_ids(request.query['ids'])
+            letters = {}
+            for model in (Letter, ArchivedLetter):
+                wanted = [letter_id for letter_id in ids if letter_id not in letters]
+                rows = (await session.execute(
+                    letter_details(model).where(model.id.in_(wanted), model.can_view(user))
+                )).all() if wanted else []
+                letters.update((letter.id, letter_detail(letter, author, officer, user)) for letter, author, officer in rows)
+            return 200, {
+                'letters': [letters[letter_id] for letter_id in ids if letter_id in letters],
+                'missing': [letter_id for letter_id in ids if letter_id not in letters],
+            }
+        if 'queue' in request.query:
+            query, column = letter_queue(request.query['queue'], user)
+            if query is None:
+                raise ApiError(404, 'Unknown queue')
+        else:
+            query, column = letter_rows().filter(Letter.user_id == user.id), Letter.created_at
+        rows = (await session.execute(page_statement(query, column, request.query.get('cursor')))).all()
+        letters, next_cursor = page_result(rows, column)
+        return 200, {'letters': [letter_summary(letter) for letter in letters], 'next_cursor': next_cursor}
+
+    async def get_letter(self, session, request, user, letter_id):
+        # Archived letters keep their id, so a miss on the live table falls back to the archive
+        for model in (Letter, ArchivedLetter):
+            row = (await session.execute(
+                letter_details(model).where(model.id == int(letter_id), model.can_view(user))
+            )).first()
+            if row is not None:
+                return 200, letter_detail(*row, user)
+        raise ApiError(404, 'Letter not found')
+
+    async def create_letter(self, session, request, user):
+        self.require_role(user, 'user')
+        if not user.approved:
+            raise ApiError(403, 'Your account is pending approval')
+        letter_type = request.json().get('type')
+        if letter_type not in LETTER_TYPES:
+            raise ApiError(400, f"type must be one of {', '.join(LETTER_TYPES)}")
+        # Writes run the same code as the HTML views, so stats, search and live updates stay in step
+        letter_id = await asyncio.to_thread(in_app_context, submit_letter_id, user, letter_type)
+        return 201, {'id': letter_id, 'status': 'submitted'}
+
+    async def review_letters(self, session, request, user, action):
+        if (user.role, action) not in LETTER_TRANSITIONS:
+            raise ApiError(403, 'Not allowed for your role')
+        payload = request.json()
+        remark = payload.get('remark') or ''
+        if not isinstance(remark, str):
+            raise ApiError(400, 'remark must be a string')
+        ids = parse_ids(payload.get('ids', []))
+        results = await asyncio.to_thread(in_app_context, review_letters, ids, user, action, remark)
+        return 200, {'results': results}
+
+    async def pending_users(self, session, request, user):
+        self.require_role(user, 'head')
+        users = (await session.execute(
+            db.select(User).where(
+                User.role == 'user',
+                User.approved == False,
+                db.or_(User.id_proof.isnot(None), User.aadhar_proof.isnot(None), User.fir_receipt.isnot(None))
+            ).order_by(User.id)
+        )).scalars()
+        return 200, {'users': [
+            dict(user_summary(pending), documents={
+                'id_proof': pending.id_proof,
+                'aadhar_proof': pending.aadhar_proof,
+                'fir_receipt': pending.fir_receipt,
+            }) for pending in users
+        ]}
+
+    async def review_users(self, session, request, user, action):
+        self.require_role(user, 'head')
+        ids = parse_ids(request.json().get('ids', []))
+        results = await asyncio.to_thread(in_app_context, review_users, ids, action)
+        return 200, {'results': results}
+
+
+application = API(app)
@@ -1,29 +1,143 @@
 import os
-from flask import Flask, render_template, redirect, url_for, flash, request, send_from_directory, session
+import base64
+import json
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+import click
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from importlib import import_module
+from string import Template
+from flask import Flask, Blueprint, current_app, redirect, url_for, flash, request, session, jsonify, abort, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from datetime import datetime
-
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-me'
-app.config['SESSION_TYPE'] = 'filesystem'  
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['LETTER_FOLDER'] = 'static/letters'
-app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'jpg', 'jpeg', 'png'}
-
-# Create necessary folders
-for folder in [app.config['UPLOAD_FOLDER'], app.config['LETTER_FOLDER']]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup, escape
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.hybrid import hybrid_method
+from flask_login import LoginManager, UserMixin, login_user, current_user
+from werkzeug.local import LocalProxy
+from werkzeug.utils import safe_join
+from datetime import datetime, timedelta, timezone
+from sessions import ServerSideSessionInterface, FileSystemSessionStore, SQLiteSessionStore
+from passwords import PasswordHasher, RateLimiter
+from jobs import JobQueue
+from pdf import write_pdf
+from metrics import Instrumentation
+from fragments import FragmentCache
+from events import EventBus
+from previews import can_preview, write_preview
+from records import RECORD_MIMETYPES, batched, read_records, record_format, write_records
+
+
+def configure(app):
+    # Defaults; create_app() applies its overrides on top
+    app.config['SECRET_KEY'] = 'your-secret-key-change-me'
+    app.config['SESSION_TYPE'] = 'filesystem'  # filesystem, sqlite or cookie
+    app.config['SESSION_FILE_DIR'] = os.path.join(app.root_path, 'flask_session')
+    app.config['SESSION_SQLITE_PATH'] = os.path.join(app.instance_path, 'sessions.db')
+    app.config['SESSION_SWEEP_INTERVAL'] = 300  # seconds between expired-session sweeps
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db').replace('postgres://', 'postgresql://', 1)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    for option in ('pool_size', 'max_overflow', 'pool_timeout'):
+        if f'DB_{option.upper()}' in os.environ:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'][option] = int(os.environ[f'DB_{option.upper()}'])
+    app.config['SQLITE_PRAGMAS'] = [
+        'journal_mode=WAL',  # readers no longer block the approving writer
+        'synchronous=NORMAL',
+        f"busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))}",
+        'cache_size=-16000',
+        'temp_store=MEMORY',
+    ]
+    app.config['UPLOAD_FOLDER'] = 'static/uploads'
+    app.config['LETTER_FOLDER'] = 'static/letters'
+    app.config['LETTER_TEMPLATE_FOLDER'] = os.path.join(app.root_path, 'static', 'letters', 'templates')
+    app.config['LETTER_CACHE_SIZE'] = 1024
+    app.config['STORE_LETTER_CONTENT'] = False  # template id + params only on new letters; create_app() turns it on for PostgreSQL
+    app.config['PDF_FOLDER'] = os.path.join(app.instance_path, 'letter_pdfs')
+    app.config['LETTER_LOGO'] = os.path.join(app.root_path, 'static', 'images', 'logo.jpeg')
+    app.config['JOB_QUEUE_PATH'] = os.path.join(app.instance_path, 'jobs.db')
+    app.config['JOB_WORKERS'] = 2  # background threads per process; 0 leaves jobs for another process
+    app.config['JOB_RETENTION'] = 7 * 24 * 3600  # seconds finished jobs are kept; failed ones stay until removed by hand
+    app.config['EVENT_SOCKET_DIR'] = os.path.join(app.instance_path, 'events')  # one socket per worker for dashboard updates
+    app.config['EVENT_QUEUE_SIZE'] = 100  # updates buffered per open dashboard before it starts missing some
+    app.config['EVENT_KEEPALIVE'] = 15  # seconds between comments on an idle stream
+    app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'jpg', 'jpeg', 'png'}
+    app.config['UPLOAD_CHUNK_SIZE'] = 64 * 1024
+    app.config['MAX_UPLOAD_SIZE'] = 10 * 1024 * 1024  # per document
+    app.config['MAX_CONTENT_LENGTH'] = 3 * app.config['MAX_UPLOAD_SIZE'] + 64 * 1024  # profile form carries up to three
+    app.config['PREVIEW_SIZE'] = 320  # longest side of document thumbnails, in pixels
+    app.config['PREVIEW_FORMAT'] = 'webp'  # or 'jpeg'
+    app.config['STATIC_FOLDER'] = os.path.join(app.root_path, 'static')
+    app.config['STATIC_MAX_AGE'] = 3600
+    app.config['STATIC_IMMUTABLE_MAX_AGE'] = 365 * 24 * 3600  # fingerprinted URLs never change
+    app.config['USE_X_SENDFILE'] = False  # let Apache/lighttpd send the file bytes
+    app.config['X_ACCEL_REDIRECT_PREFIX'] = None  # e.g. '/_static/' for an nginx internal location
+    app.config['QUEUE_PAGE_SIZE'] = 25
+    app.config['REMARK_PREVIEW_LENGTH'] = 200  # characters of the head remark shown in list views
+    app.config['FRAGMENT_CACHE_SIZE'] = 4 * 1024 * 1024  # characters of rendered rows and letter bodies; 0 disables
+    app.config['BULK_MAX_IDS'] = 1000
+    app.config['ARCHIVE_AFTER_DAYS'] = 365  # finalized letters untouched this long move to the archive table
+    app.config['ARCHIVE_BATCH_SIZE'] = 500  # letters moved per transaction
+    app.config['IMPORT_BATCH_SIZE'] = 1000  # records per transaction in bulk imports
+    app.config['IMPORT_ERROR_LIMIT'] = 20  # rejected rows reported by line number; the rest are only counted
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'  # changing this rehashes passwords at next login
+    app.config['PASSWORD_HASH_WORKERS'] = os.cpu_count()  # 0 hashes inline on the request thread
+    app.config['PASSWORD_HASH_MAX_PENDING'] = 4 * os.cpu_count()
+    app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = 2.0
+    app.config['LOGIN_RATE_LIMIT'] = (10, 60)  # attempts per username per window in seconds
+    app.config['USER_CACHE_TTL'] = 60  # seconds a worker trusts its cached copy of a user
+    app.config['USER_CACHE_SIZE'] = 10000
+    app.config['QUERY_BUDGET'] = 12  # SQL statements per request before we log a warning
+    app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION') == '1'  # timing, /metrics and profiling
+    app.config['SLOW_REQUEST_THRESHOLD'] = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 1.0))  # seconds
+    app.config['SLOW_QUERY_THRESHOLD'] = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.1))
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.05))  # share of requests run under cProfile
+    app.config['PROFILE_FOLDER'] = os.path.join(app.instance_path, 'profiles')
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # bearer token required by /metrics when set
+    app.config['JINJA_BYTECODE_CACHE'] = os.path.join(app.instance_path, 'jinja_cache')  # None compiles templates in every process
+
+def make_session_interface(app):
+    if app.config['SESSION_TYPE'] == 'sqlite':
+        store = SQLiteSessionStore(app.config['SESSION_SQLITE_PATH'])
+    elif app.config['SESSION_TYPE'] == 'filesystem':
+        store = FileSystemSessionStore(app.config['SESSION_FILE_DIR'])
+    else:
+        return app.session_interface
+    return ServerSideSessionInterface(store, app.config['SESSION_SWEEP_INTERVAL'])
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+# App-wide hooks, template globals and CLI commands, registered on every app create_app() builds
+core = Blueprint('core', __name__, cli_group=None)
+job_handlers = {}
+
+def job_handler(kind):
+    def register(fn):
+        job_handlers[kind] = fn
+        return fn
+    return register
+
+def extension(name):
+    # Per-app objects are built by create_app() and kept in app.extensions, so several apps can share a process
+    return LocalProxy(lambda: current_app.extensions[name])
+
+password_hasher = extension('password_hasher')
+login_limiter = extension('login_limiter')
+fragment_cache = extension('fragment_cache')
+job_queue = extension('job_queue')
+event_bus = extension('event_bus')
+user_cache = extension('user_cache')
+render_letter = extension('render_letter')
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,7 +146,7 @@ class User(UserMixin, db.Model):
     designation = db.Column(db.String(100), nullable=False)
     department = db.Column(db.String(100))  # New field for DO profile
     phone = db.Column(db.String(20))       # New field for DO profile
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)  # scrypt hashes run to 162 characters
     role = db.Column(db.String(20), default='user')  # user, do, head
     id_proof = db.Column(db.String(100))
     aadhar_proof = db.Column(db.String(100))
@@ -48,15 +162,46 @@ class User(UserMixin, db.Model):
         return False
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        try:
+            return password_hasher.verify(self.password_hash, password)
+        except ValueError:
+            # A stored hash werkzeug cannot read fails the login rather than the request
+            return False
 
     def has_submitted_docs(self):
         return (self.id_proof and self.aadhar_proof) or self.fir_receipt
 
-class Letter(db.Model):
+class LetterAccess:
+    # Shared by live and archived letters
+    @property
+    def body(self):
+        if self.template:
+            return render_letter(self.template, **self.template_params)
+        return self.content
+
+    @hybrid_method
+    def can_view(self, user):
+        if user.role == 'head':
+            return True
+        if user.role == 'officer' and self.status in ['submitted', 'officer_approved', 'officer_rejected']:
+            return True
+        if user.id == self.user_id:
+            return True
+        return False
+
+    @can_view.expression
+    def can_view(cls, user):
+        # Same rules as above, as a WHERE clause
+        if user.role == 'head':
+            return db.true()
+        if user.role == 'officer':
+            return db.or_(cls.status.in_(['submitted', 'officer_approved', 'officer_rejected']), cls.user_id == user.id)
+        return cls.user_id == user.id
+
+class Letter(LetterAccess, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(100), nullable=False)
@@ -69,522 +214,1290 @@ class Letter(db.Model):
     head_remark = db.Column(db.Text)
     officer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     head_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    template = db.Column(db.String(20))
+    template_params = db.Column(db.JSON)
 
     user = db.relationship('User', foreign_keys=[user_id], backref='letters')
     officer = db.relationship('User', foreign_keys=[officer_id])
     head = db.relationship('User', foreign_keys=[head_id])
 
-    def can_view(self, user):
-        if user.role == 'head':
-            return True
-        if user.role == 'officer' and self.status in ['submitted', 'officer_approved', 'officer_rejected']:
-            return True
-        if user.id == self.user_id:
-            return True
-        return False
+    # Back the review queues: pending by (status, created_at), decisions by reviewer
+    __table_args__ = (
+        db.Index('ix_letter_status_created', 'status', 'created_at'),
+        db.Index('ix_letter_officer_status_updated', 'officer_id', 'status', 'updated_at'),
+        db.Index('ix_letter_head_status_updated', 'head_id', 'status', 'updated_at'),
+    )
+
+class ArchivedLetter(LetterAccess, db.Model):
+    # Finalized letters moved out of the hot table by archive_letters(); they keep their id, so links and search still resolve
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    compressed_content = db.Column(db.LargeBinary, nullable=False)  # zlib
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    filename = db.Column(db.String(100))
+    officer_remark = db.Column(db.Text)
+    head_remark = db.Column(db.Text)
+    officer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    head_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    template = db.Column(db.String(20))
+    template_params = db.Column(db.JSON)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship('User', foreign_keys=[user_id])
+    officer = db.relationship('User', foreign_keys=[officer_id])
+    head = db.relationship('User', foreign_keys=[head_id])
+
+    __table_args__ = (
+        db.Index('ix_archived_letter_user', 'user_id'),
+    )
+
+    @property
+    def content(self):
+        return zlib.decompress(self.compressed_content).decode()
+
+    @classmethod
+    def from_letter(cls, letter):
+        return cls(
+            id=letter.id, user_id=letter.user_id, title=letter.title,
+            compressed_content=zlib.compress((letter.content or '').encode(), 9),
+            status=letter.status, created_at=letter.created_at, updated_at=letter.updated_at,
+            filename=letter.filename, officer_remark=letter.officer_remark, head_remark=letter.head_remark,
+            officer_id=letter.officer_id, head_id=letter.head_id,
+            template=letter.template, template_params=letter.template_params,
+        )
+
+def find_letter(letter_id):
+    # Read-only views fall back to the archive; review routes only ever act on live letters
+    return db.session.get(Letter, letter_id) or db.session.get(ArchivedLetter, letter_id)
+
+def user_letters(user_id):
+    # An author's own history spans both tables, newest change first
+    columns = ('id', 'title', 'status', 'updated_at', 'officer_remark', 'head_remark')
+    letters = db.union_all(*(
+        db.select(*(getattr(model, column) for column in columns)).where(model.user_id == user_id)
+        for model in (Letter, ArchivedLetter)
+    )).subquery()
+    return db.session.execute(db.select(letters).order_by(letters.c.updated_at.desc())).all()
+
+# Full-text index over letters, kept in step with the letter table by the mapper events below
+letter_fts = db.table('letter_fts', db.column('rowid'), db.column('title'), db.column('content'),
+                      db.column('officer_remark'), db.column('head_remark'), db.column('author'))
+
+create_letter_fts = db.DDL(
+    'CREATE VIRTUAL TABLE IF NOT EXISTS letter_fts USING fts5('
+    'title, content, officer_remark, head_remark, author, tokenize="unicode61 remove_diacritics 2")'
+)
+event.listen(Letter.__table__, 'after_create', create_letter_fts.execute_if(dialect='sqlite'))
+event.listen(Letter.__table__, 'before_drop', db.DDL('DROP TABLE IF EXISTS letter_fts').execute_if(dialect='sqlite'))
+
+def index_letter(connection, letter):
+    if connection.dialect.name != 'sqlite':
+        return
+    author = connection.execute(db.select(User.full_name).where(User.id == letter.user_id)).scalar()
+    connection.execute(db.text(
+        'INSERT OR REPLACE INTO letter_fts (rowid, title, content, officer_remark, head_remark, author) '
+        'VALUES (:id, :title, :content, :officer_remark, :head_remark, :author)'
+    ), {
+        'id': letter.id,
+        'title': letter.title,
+        'content': letter.body,
+        'officer_remark': letter.officer_remark,
+        'head_remark': letter.head_remark,
+        'author': author,
+    })
+
+@event.listens_for(Letter, 'after_insert')
+@event.listens_for(Letter, 'after_update')
+def sync_letter_search(mapper, connection, letter):
+    index_letter(connection, letter)
+
+@event.listens_for(Letter, 'after_delete')
+def drop_letter_search(mapper, connection, letter):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(db.text('DELETE FROM letter_fts WHERE rowid = :id'), {'id': letter.id})
+
+UNREVIEWED_STATUSES = ('draft', 'submitted')
+FINAL_STATUSES = ('head_approved', 'head_rejected')
+
+class LetterStat(db.Model):
+    # Running letter counts per status and reviewing officer (0 before an officer decides)
+    status = db.Column(db.String(20), primary_key=True)
+    officer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class ApprovalLatency(db.Model):
+    # Submission-to-final-decision time, bucketed by decision day
+    day = db.Column(db.Date, primary_key=True)
+    decisions = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0)
+    max_seconds = db.Column(db.Float, nullable=False, default=0)
+
+def stat_key(status, officer_id):
+    status = status or 'draft'
+    return status, 0 if status in UNREVIEWED_STATUSES else officer_id or 0
+
+def record_letter_stats(connection, deltas, decisions=()):
+    for (status, officer_id), delta in deltas.items():
+        if delta:
+            connection.execute(db.text(
+                'INSERT INTO letter_stat (status, officer_id, count) VALUES (:status, :officer_id, :delta) '
+                'ON CONFLICT (status, officer_id) DO UPDATE SET count = letter_stat.count + excluded.count'
+            ), {'status': status, 'officer_id': officer_id, 'delta': delta})
+    for day, seconds in decisions:
+        connection.execute(db.text(
+            'INSERT INTO approval_latency (day, decisions, total_seconds, max_seconds) '
+            'VALUES (:day, 1, :seconds, :seconds) '
+            'ON CONFLICT (day) DO UPDATE SET decisions = approval_latency.decisions + 1, '
+            'total_seconds = approval_latency.total_seconds + excluded.total_seconds, '
+            'max_seconds = CASE WHEN excluded.max_seconds > approval_latency.max_seconds '
+            'THEN excluded.max_seconds ELSE approval_latency.max_seconds END'
+        ).bindparams(db.bindparam('day', type_=db.Date)), {'day': day, 'seconds': seconds})
+
+def decision_latency(created_at, decided_at):
+    return decided_at.date(), max((decided_at - created_at).total_seconds(), 0)
+
+@event.listens_for(Letter, 'after_insert')
+def count_new_letter(mapper, connection, letter):
+    record_letter_stats(connection, {stat_key(letter.status, letter.officer_id): 1})
+
+@event.listens_for(Letter, 'after_update')
+def count_status_change(mapper, connection, letter):
+    state = db.inspect(letter)
+    status = state.attrs.status.history
+    officer = state.attrs.officer_id.history
+    if not (status.has_changes() or officer.has_changes()):
+        return
+    old_status = status.deleted[0] if status.deleted else letter.status
+    old_officer = officer.deleted[0] if officer.deleted else letter.officer_id
+    deltas = Counter()
+    deltas[stat_key(old_status, old_officer)] -= 1
+    deltas[stat_key(letter.status, letter.officer_id)] += 1
+    decisions = []
+    if letter.status in FINAL_STATUSES and old_status not in FINAL_STATUSES:
+        decisions.append(decision_latency(letter.created_at, datetime.utcnow()))
+    record_letter_stats(connection, deltas, decisions)
+
+@event.listens_for(Letter, 'after_delete')
+def count_deleted_letter(mapper, connection, letter):
+    record_letter_stats(connection, {stat_key(letter.status, letter.officer_id): -1})
+
+def reconcile_letter_stats():
+    # Full rebuild from the letter and archive tables; corrects any drift in the incremental counters
+    counts = Counter()
+    latencies = {}
+    rows = db.session.execute(db.union_all(*(
+        db.select(model.status, model.officer_id, model.created_at, model.updated_at)
+        for model in (Letter, ArchivedLetter)
+    )), execution_options={'yield_per': 1000})
+    for status, officer_id, created_at, updated_at in rows:
+        counts[stat_key(status, officer_id)] += 1
+        if status in FINAL_STATUSES:
+            day, seconds = decision_latency(created_at, updated_at)
+            bucket = latencies.setdefault(day, ApprovalLatency(day=day, decisions=0, total_seconds=0, max_seconds=0))
+            bucket.decisions += 1
+            bucket.total_seconds += seconds
+            bucket.max_seconds = max(bucket.max_seconds, seconds)
+    LetterStat.query.delete()
+    ApprovalLatency.query.delete()
+    db.session.add_all(LetterStat(status=status, officer_id=officer_id, count=count)
+                       for (status, officer_id), count in counts.items())
+    db.session.add_all(latencies.values())
+    db.session.commit()
+
+@job_handler('reconcile_letter_stats')
+def reconcile_letter_stats_job(payload):
+    reconcile_letter_stats()
+    schedule_stats_reconciliation()
+
+def schedule_stats_reconciliation():
+    # Nightly at midnight UTC; the key keeps concurrent workers from queueing it twice
+    tomorrow = datetime.utcnow().date() + timedelta(days=1)
+    run_at = datetime.combine(tomorrow, datetime.min.time(), tzinfo=timezone.utc).timestamp()
+    job_queue.enqueue('reconcile_letter_stats', {}, key=f'reconcile_letter_stats:{tomorrow}', run_at=run_at)
+
+@core.before_app_request
+def schedule_background_jobs():
+    if current_app.extensions.get('scheduled_pid') != os.getpid():
+        current_app.extensions['scheduled_pid'] = os.getpid()
+        schedule_stats_reconciliation()
+
+@core.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    reconcile_letter_stats()
+    click.echo('Letter statistics rebuilt.')
+
+def archive_letters(before, batch_size=None):
+    # Moves finalized letters last updated before `before`, one committed batch at a time
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    # SQLite hands the highest rowid out again once it is deleted, so the newest letter always stays behind
+    newest = db.select(db.func.max(Letter.id)).scalar_subquery()
+    archived = 0
+    while True:
+        letters = Letter.query.filter(
+            Letter.status.in_(FINAL_STATUSES),
+            Letter.updated_at < before,
+            Letter.id < newest
+        ).order_by(Letter.id).limit(batch_size).all()
+        if not letters:
+            return archived
+        db.session.add_all(ArchivedLetter.from_letter(letter) for letter in letters)
+        # A bulk DELETE skips the mapper events, so the status counts and search index keep covering these letters
+        db.session.execute(
+            db.delete(Letter).where(Letter.id.in_([letter.id for letter in letters])),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        db.session.expunge_all()
+        archived += len(letters)
+
+@core.cli.command('archive-letters')
+@click.option('--days', type=int, help='Archive letters finalized more than this many days ago.')
+@click.option('--batch-size', type=int, help='Letters moved per transaction.')
+def archive_letters_command(days, batch_size):
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    archived = archive_letters(datetime.utcnow() - timedelta(days=days), batch_size)
+    click.echo(f'Archived {archived} letters.')
+
+def letter_stats(officers):
+    by_status = Counter()
+    by_officer = defaultdict(Counter)
+    for stat in LetterStat.query.all():
+        by_status[stat.status] += stat.count
+        if stat.officer_id:
+            by_officer[stat.officer_id][stat.status] += stat.count
+    since = datetime.utcnow().date() - timedelta(days=30)
+    decisions, total_seconds, max_seconds = db.session.query(
+        db.func.sum(ApprovalLatency.decisions),
+        db.func.sum(ApprovalLatency.total_seconds),
+        db.func.max(ApprovalLatency.max_seconds)
+    ).filter(ApprovalLatency.day >= since).one()
+    names = {officer.id: officer.full_name for officer in officers}
+    return {
+        'by_status': by_status,
+        'by_officer': [(names.get(officer_id, f'Officer #{officer_id}'), counts)
+                       for officer_id, counts in sorted(by_officer.items())],
+        'decisions': decisions or 0,
+        'average_hours': round(total_seconds / decisions / 3600, 1) if decisions else None,
+        'max_hours': round(max_seconds / 3600, 1) if decisions else None,
+    }
+
+def reindex_letters(letter_ids):
+    # Bulk UPDATEs skip the mapper events, so callers reindex the rows they touched
+    connection = db.session.connection()
+    for letter in Letter.query.filter(Letter.id.in_(letter_ids)):
+        index_letter(connection, letter)
+
+# Dashboard updates are queued on the session and only published once the change is committed
+def announce(session, kind, **data):
+    session.info.setdefault('announcements', []).append(dict(data, kind=kind))
+
+@event.listens_for(db.session, 'after_commit')
+def publish_announcements(session):
+    event_bus.publish(*session.info.pop('announcements', []))
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_announcements(session):
+    session.info.pop('announcements', None)
+
+def announce_letter(session, letter_id, status, officer_id, head_id):
+    announce(session, 'letter', id=letter_id, status=status, officer_id=officer_id, head_id=head_id)
+
+@event.listens_for(Letter, 'after_insert')
+def announce_new_letter(mapper, connection, letter):
+    announce_letter(db.inspect(letter).session, letter.id, letter.status, letter.officer_id, letter.head_id)
+
+@event.listens_for(Letter, 'after_update')
+def announce_status_change(mapper, connection, letter):
+    if db.inspect(letter).attrs.status.history.has_changes():
+        announce_letter(db.inspect(letter).session, letter.id, letter.status, letter.officer_id, letter.head_id)
+
+def announce_user(session, user):
+    pending = user.role == 'user' and not user.approved and bool(user.id_proof or user.aadhar_proof or user.fir_receipt)
+    announce(session, 'user', id=user.id, pending=pending)
+
+LETTER_TYPES = {
+    'permission': 'Permission Letter for Event Participation',
+    'noc': 'No Objection Certificate Request',
+    'leave': 'Leave Application',
+}
+
+def letter_renderer(folder, cache_size):
+    templates = {}
+    for letter_type in LETTER_TYPES:
+        with open(os.path.join(folder, f'{letter_type}.txt')) as f:
+            templates[letter_type] = Template(f.read())
+    
+    @lru_cache(maxsize=cache_size)
+    def render(letter_type, full_name, designation):
+        return templates[letter_type].substitute(full_name=full_name, designation=designation)
+    return render
+
+class CachedUser(UserMixin):
+    # Snapshot of the columns authorization needs; anything else loads the row on demand
+    fields = ('id', 'role', 'approved', 'profile_complete', 'id_proof', 'aadhar_proof', 'fir_receipt')
+
+    def __init__(self, record=None, **values):
+        self.__dict__.update(values)
+        if record is not None:
+            self._record = record
+
+    @property
+    def record(self):
+        if '_record' not in self.__dict__:
+            self._record = db.session.get(User, self.id)
+        return self._record
+
+    def __getattr__(self, name):
+        return getattr(self.record, name)
+
+    can_access_letters = User.can_access_letters
+    has_submitted_docs = User.has_submitted_docs
+
+class UserCache:
+    # LRU of authorization fields per user id, shared by every request thread of one app
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            cached = self.entries.get(user_id)
+            if cached is None:
+                return None
+            if cached[0] <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return cached[1]
+
+    def set(self, user_id, values):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+def invalidate_user(user_id):
+    user_cache.pop(user_id)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return CachedUser(**cached)
+    
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate_user(user_id)
+        return None
+    values = {field: getattr(user, field) for field in CachedUser.fields}
+    user_cache.set(user_id, values)
+    return CachedUser(record=user, **values)
+
+@event.listens_for(Engine, 'connect')
+def tune_sqlite(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for pragma in current_app.config['SQLITE_PRAGMAS']:
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+@core.after_app_request
+def report_query_count(response):
+    query_count = g.get('query_count', 0)
+    if current_app.debug or current_app.testing:
+        response.headers['X-Query-Count'] = str(query_count)
+    if query_count > current_app.config['QUERY_BUDGET']:
+        current_app.logger.warning('%s issued %d SQL statements', request.endpoint, query_count)
+    return response
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def upload_relpath(name):
+    # Content-addressed uploads fan out as ab/cd/abcd...ef.pdf; older uploads sit flat
+    digest = name.rsplit('.', 1)[0]
+    if len(digest) == 64:
+        return os.path.join(digest[:2], digest[2:4], name)
+    return name
+
+def upload_path(name):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], upload_relpath(name))
+
+def preview_path(name):
+    # Thumbnails sit next to the original, so a duplicate upload reuses both
+    return f"{upload_path(name)}.preview.{current_app.config['PREVIEW_FORMAT']}"
+
+@job_handler('document_preview')
+def document_preview_job(payload):
+    path = upload_path(payload['name'])
+    if os.path.exists(path) and not os.path.exists(preview_path(payload['name'])):
+        write_preview(path, preview_path(payload['name']), current_app.config['PREVIEW_SIZE'], current_app.config['PREVIEW_FORMAT'])
+
+@core.cli.command('build-previews')
+def build_previews_command():
+    # Renders thumbnails inline for documents uploaded before previews existed
+    built = 0
+    names = db.session.query(User.id_proof, User.aadhar_proof, User.fir_receipt).all()
+    for name in {name for row in names for name in row if name}:
+        path = upload_path(name)
+        if os.path.exists(path) and can_preview(path) and not os.path.exists(preview_path(name)):
+            document_preview_job({'name': name})
+            built += 1
+    click.echo(f'Built {built} document previews.')
+
+@core.app_template_global()
+def upload_links(name):
+    # Link to the original and, once the background job has made one, its thumbnail
+    if not name or not os.path.exists(upload_path(name)):
+        return None, None
+    relpath = upload_relpath(name).replace(os.sep, '/')
+    original = url_for('main.static_files', filename=f'uploads/{relpath}')
+    if not os.path.exists(preview_path(name)):
+        return original, None
+    return original, static_url(f"uploads/{relpath}.preview.{current_app.config['PREVIEW_FORMAT']}")
 
 def save_uploaded_file(file):
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-        return filename
-    return None
+    if not (file and allowed_file(file.filename)):
+        return None
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=current_app.config['UPLOAD_FOLDER'])
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(current_app.config['UPLOAD_CHUNK_SIZE']), b''):
+                size += len(chunk)
+                if size > current_app.config['MAX_UPLOAD_SIZE']:
+                    abort(413)
+                digest.update(chunk)
+                out.write(chunk)
+        name = f'{digest.hexdigest()}.{extension}'
+        path = upload_path(name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        if can_preview(path) and not os.path.exists(preview_path(name)):
+            job_queue.enqueue('document_preview', {'name': name}, key=name)
+        return name
+    finally:
+        # Left behind only when the upload was rejected or is a duplicate
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def encode_cursor(letter, column):
+    raw = f'{getattr(letter, column.key).isoformat()}|{letter.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        value, letter_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(value), int(letter_id)
+    except ValueError:
+        return None
+
+def page_statement(query, column, cursor=None, per_page=None):
+    # Keyset pagination on (column, id) so every page is an index range scan
+    per_page = per_page or current_app.config['QUEUE_PAGE_SIZE']
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, letter_id = position
+        query = query.filter(db.or_(
+            column < value,
+            db.and_(column == value, Letter.id < letter_id)
+        ))
+    return query.order_by(column.desc(), Letter.id.desc()).limit(per_page + 1)
+
+def page_result(rows, column, per_page=None):
+    per_page = per_page or current_app.config['QUEUE_PAGE_SIZE']
+    letters = [LetterRow(*row) for row in rows]
+    next_cursor = encode_cursor(letters[per_page - 1], column) if len(letters) > per_page else None
+    return letters[:per_page], next_cursor
+
+def paginate_letters(query, column, cursor=None, per_page=None):
+    rows = db.session.execute(page_statement(query, column, cursor, per_page))
+    return page_result(rows, column, per_page)
+
+class LetterRow:
+    # What the list views show; content and full remarks stay in the database until view_letter
+    __slots__ = ('id', 'title', 'status', 'created_at', 'updated_at', 'author', 'officer', 'head_remark')
+
+    def __init__(self, id, title, status, created_at, updated_at, author, officer, head_remark):
+        self.id = id
+        self.title = title
+        self.status = status
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.author = author
+        self.officer = officer
+        self.head_remark = head_remark
+
+Author = db.aliased(User)
+Officer = db.aliased(User)
+
+def letter_rows(*extra, model=Letter):
+    # A SELECT of plain columns in LetterRow order, followed by any extra columns; the JSON API runs these too
+    return (
+        db.select(
+            model.id, model.title, model.status, model.created_at, model.updated_at,
+            Author.full_name, Officer.full_name,
+            db.func.substr(model.head_remark, 1, current_app.config['REMARK_PREVIEW_LENGTH']),
+            *extra
+        )
+        .select_from(model)
+        .join(Author, model.user_id == Author.id)
+        .outerjoin(Officer, model.officer_id == Officer.id)
+    )
+
+def letter_queue(queue, user):
+    if queue == 'officer_pending' and user.role == 'officer':
+        return letter_rows().filter(Letter.status == 'submitted'), Letter.created_at
+    if queue == 'officer_reviewed' and user.role == 'officer':
+        return letter_rows().filter(
+            Letter.officer_id == user.id,
+            Letter.status.in_(['officer_approved', 'officer_rejected'])
+        ), Letter.updated_at
+    if queue == 'head_pending' and user.role == 'head':
+        return letter_rows().filter(Letter.status == 'officer_approved'), Letter.created_at
+    if queue == 'head_reviewed' and user.role == 'head':
+        return letter_rows().filter(
+            Letter.head_id == user.id,
+            Letter.status.in_(['head_approved', 'head_rejected'])
+        ), Letter.updated_at
+    return None, None
+
+@core.app_template_global()
+def letter_fragment(name, letter):
+    # A letter's rows and body only change when updated_at does, so stale entries are never hit
+    key = (name, letter.id, letter.updated_at, current_user.role)
+    template = f'fragments/{name}.html'
+    return fragment_cache.get_or_render(key, lambda: Markup(current_app.jinja_env.get_template(template).render(letter=letter)))
+
+def letter_summary(letter):
+    return {
+        'id': letter.id,
+        'title': letter.title,
+        'author': letter.author,
+        'officer': letter.officer,
+        'status': letter.status,
+        'status_label': letter.status.replace('_', ' ').title(),
+        'created_on': letter.created_at.strftime('%Y-%m-%d'),
+        'updated_on': letter.updated_at.strftime('%Y-%m-%d'),
+        'head_remark': letter.head_remark,
+        'view_url': url_for('main.view_letter', letter_id=letter.id),
+        'officer_approve_url': url_for('officer.approve_letter', letter_id=letter.id),
+        'officer_reject_url': url_for('officer.reject_letter', letter_id=letter.id),
+        'head_approve_url': url_for('head.approve_letter', letter_id=letter.id),
+        'head_reject_url': url_for('head.reject_letter', letter_id=letter.id),
+    }
+
+def letter_pdf_path(letter):
+    version = letter.updated_at.strftime('%Y%m%d%H%M%S%f')
+    return os.path.join(current_app.config['PDF_FOLDER'], f'{letter.id}-{version}.pdf')
+
+def render_letter_pdf(letter):
+    path = letter_pdf_path(letter)
+    if os.path.exists(path):
+        return path
+    
+    blocks = [('title', letter.title), ('text', ''), ('text', letter.body), ('text', '')]
+    if letter.officer:
+        blocks += [('heading', 'Reviewed by'), ('text', f'{letter.officer.full_name}, {letter.officer.designation}')]
+        if letter.officer_remark:
+            blocks.append(('text', f'Remark: {letter.officer_remark}'))
+        blocks.append(('text', ''))
+    if letter.head:
+        blocks += [
+            ('heading', 'Approved by'),
+            ('text', f'{letter.head.full_name}, {letter.head.designation}'),
+            ('text', f'Date: {letter.updated_at.strftime("%d %B %Y")}'),
+        ]
+        if letter.head_remark:
+            blocks.append(('text', f'Remark: {letter.head_remark}'))
+    write_pdf(path, blocks, logo=current_app.config['LETTER_LOGO'])
+    
+    # Drop renders of earlier versions of this letter
+    for name in os.listdir(current_app.config['PDF_FOLDER']):
+        if name.startswith(f'{letter.id}-') and name != os.path.basename(path):
+            os.remove(os.path.join(current_app.config['PDF_FOLDER'], name))
+    return path
+
+@job_handler('letter_pdf')
+def letter_pdf_job(payload):
+    letter = find_letter(payload['letter_id'])
+    if letter is not None and letter.status == 'head_approved':
+        render_letter_pdf(letter)
+
+def queue_letter_pdf(letter_id):
+    job_queue.enqueue('letter_pdf', {'letter_id': letter_id}, key=str(letter_id))
+
+LETTER_TRANSITIONS = {
+    ('officer', 'approve'): ('submitted', 'officer_approved'),
+    ('officer', 'reject'): ('submitted', 'officer_rejected'),
+    ('head', 'approve'): ('officer_approved', 'head_approved'),
+    ('head', 'reject'): ('officer_approved', 'head_rejected'),
+}
+
+def request_payload():
+    payload = request.get_json(silent=True)
+    return payload if isinstance(payload, dict) else {}
+
+def request_remark():
+    return request_payload().get('remark', '') if request.is_json else request.form.get('remark', '')
+
+def request_ids():
+    raw = request_payload().get('ids', []) if request.is_json else request.form.getlist('ids')
+    if not isinstance(raw, list):
+        abort(400)
+    # One bad id fails the whole request, as it does on the API, rather than reviewing the rest
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw))
+    except (TypeError, ValueError):
+        abort(400)
+    if len(ids) > current_app.config['BULK_MAX_IDS']:
+        abort(400)
+    return ids
+
+def bulk_results(ids, updated, existing, error):
+    results = []
+    for item_id in ids:
+        if item_id in updated:
+            results.append({'id': item_id, 'ok': True})
+        elif item_id in existing:
+            results.append({'id': item_id, 'ok': False, 'error': error})
+        else:
+            results.append({'id': item_id, 'ok': False, 'error': 'Not found'})
+    return results
+
+def bulk_response(results, endpoint):
+    if request.is_json:
+        return jsonify(results=results)
+    done = sum(result['ok'] for result in results)
+    flash(f'{done} of {len(results)} processed.' if done else 'Nothing was processed.', 'success' if done else 'error')
+    return redirect(url_for(endpoint))
+
+def review_letters(ids, reviewer, action, remark):
+    # One guarded UPDATE ... RETURNING applies every valid transition in a single statement
+    role = reviewer.role
+    from_status, to_status = LETTER_TRANSITIONS[(role, action)]
+    if action == 'reject' and not remark:
+        return [{'id': letter_id, 'ok': False, 'error': 'Rejection remark is required'} for letter_id in ids]
+    values = {
+        Letter.status: to_status,
+        Letter.updated_at: datetime.utcnow(),
+        getattr(Letter, f'{role}_id'): reviewer.id,
+        getattr(Letter, f'{role}_remark'): remark,
+    }
+    rows = db.session.execute(
+        db.update(Letter)
+        .where(Letter.id.in_(ids), Letter.status == from_status)
+        .values(values)
+        .returning(Letter.id, Letter.officer_id, Letter.head_id, Letter.created_at)
+    ).all() if ids else []
+    updated = {row.id for row in rows}
+    deltas = Counter()
+    decisions = []
+    for row in rows:
+        announce_letter(db.session, row.id, to_status, row.officer_id, row.head_id)
+        deltas[stat_key(from_status, row.officer_id)] -= 1
+        deltas[stat_key(to_status, row.officer_id)] += 1
+        if to_status in FINAL_STATUSES:
+            decisions.append(decision_latency(row.created_at, values[Letter.updated_at]))
+    record_letter_stats(db.session.connection(), deltas, decisions)
+    reindex_letters(updated)
+    db.session.commit()
+    if to_status == 'head_approved':
+        for letter_id in updated:
+            queue_letter_pdf(letter_id)
+    missing = set(ids) - updated
+    existing = set(db.session.execute(
+        db.select(Letter.id).where(Letter.id.in_(missing))
+    ).scalars()) if missing else set()
+    return bulk_results(ids, updated, existing, f'Letter is not in correct state for {"approval" if action == "approve" else "rejection"}')
+
+def fts_query(terms):
+    # Quote every word so user input can't hit FTS5 syntax; prefix-match the last one
+    words = ['"{}"'.format(word.replace('"', '""')) for word in terms.split()]
+    if words:
+        words[-1] += '*'
+    return ' '.join(words)
+
+def search_letters(terms, user, page=1):
+    # Live and archived letters share the index, so each table is one branch of a UNION ranked together
+    per_page = current_app.config['QUEUE_PAGE_SIZE']
+    if db.engine.dialect.name == 'sqlite':
+        match = fts_query(terms)
+        if not match:
+            return [], False
+        fts = db.literal_column('letter_fts')
+        
+        def branch(model):
+            snippet = db.func.snippet(fts, -1, '\x02', '\x03', '...', 16)
+            rank = db.func.bm25(fts, 10.0, 1.0, 2.0, 2.0, 5.0)
+            return (
+                letter_rows(snippet, rank.label('rank'), model=model)
+                .join(letter_fts, letter_fts.c.rowid == model.id)
+                .filter(fts.op('MATCH')(match))
+            )
+    else:
+        # PostgreSQL: rank the stored text with tsvector; archived letters match on title and remarks
+        if not terms.split():
+            return [], False
+        tsquery = db.func.websearch_to_tsquery('simple', terms)
+        
+        def branch(model):
+            text = (model.title, model.content) if model is Letter else (model.title,)
+            document = db.func.to_tsvector('simple', db.func.concat_ws(' ', *text, model.officer_remark, model.head_remark))
+            snippet = db.func.ts_headline('simple', db.func.concat_ws(' ', *text), tsquery,
+                                          'StartSel=\x02, StopSel=\x03, MaxWords=16')
+            return (
+                letter_rows(snippet, (-db.func.ts_rank(document, tsquery)).label('rank'), model=model)
+                .filter(document.op('@@')(tsquery))
+            )
+    matches = db.union_all(*(
+        branch(model).filter(model.can_view(user)) for model in (Letter, ArchivedLetter)
+    )).subquery()
+    rows = db.session.execute(
+        db.select(matches)
+        .order_by(matches.c.rank)
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+    ).all()
+    results = []
+    for *columns, text, rank in rows[:per_page]:
+        highlighted = Markup(str(escape(text or '')).replace('\x02', '<mark>').replace('\x03', '</mark>'))
+        results.append((LetterRow(*columns), highlighted))
+    return results, len(rows) > per_page
+
+def log_in(user):
+    # A fresh session id at every login, so an id fixed before login does not carry over
+    if isinstance(current_app.session_interface, ServerSideSessionInterface):
+        current_app.session_interface.regenerate(session)
+    login_user(user)
 
 def redirect_based_on_role(user):
     if user.role == 'head':
-        return redirect(url_for('head_dashboard'))
+        return redirect(url_for('head.dashboard'))
     elif user.role == 'officer':
-        return redirect(url_for('officer_dashboard'))
+        return redirect(url_for('officer.dashboard'))
     elif not user.has_submitted_docs():
-        return redirect(url_for('profile'))
+        return redirect(url_for('user.profile'))
     elif not user.approved:
-        return redirect(url_for('pending_approval'))
+        return redirect(url_for('user.pending_approval'))
     else:
-        return redirect(url_for('home'))
-
-@app.route('/')
-def index():
-    if current_user.is_authenticated:
-        return redirect_based_on_role(current_user)
-    return render_template('index.html')
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if current_user.is_authenticated:
-        return redirect_based_on_role(current_user)
-    
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        user = User.query.filter_by(username=username).first()
-        
-        if user and user.check_password(password):
-            login_user(user)
-            return redirect_based_on_role(user)
-        else:
-            flash('Invalid username or password')
-    
-    return render_template('login.html')
+        return redirect(url_for('user.home'))
 
-@app.route('/register', methods=['GET', 'POST'])
-def register():
-    if current_user.is_authenticated:
-        return redirect_based_on_role(current_user)
-    
-    if request.method == 'POST':
-        username = request.form['username']
-        full_name = request.form['full_name']
-        designation = request.form['designation']
-        password = request.form['password']
-        
-        if User.query.filter_by(username=username).first():
-            flash('Username already exists')
-            return redirect(url_for('register'))
-        
-        new_user = User(
-            username=username,
-            full_name=full_name,
-            designation=designation,
-            role='user'
-        )
-        new_user.set_password(password)
-        db.session.add(new_user)
+def submit_letter(user, letter_type):
+    params = {'full_name': user.full_name, 'designation': user.designation}
+    letter = Letter(
+        title=LETTER_TYPES[letter_type],
+        user_id=user.id,
+        status='submitted'
+    )
+    if current_app.config['STORE_LETTER_CONTENT']:
+        letter.content = render_letter(letter_type, **params)
+    else:
+        letter.content = ''
+        letter.template = letter_type
+        letter.template_params = params
+    db.session.add(letter)
+    db.session.commit()
+    return letter
+
+def review_users(ids, action):
+    if action == 'approve':
+        statement = db.update(User).where(
+            User.id.in_(ids),
+            User.role == 'user',
+            db.or_(db.and_(User.id_proof.isnot(None), User.aadhar_proof.isnot(None)), User.fir_receipt.isnot(None))
+        ).values(approved=True)
+        error = 'User has not submitted all documents'
+    else:
+        statement = db.update(User).where(User.id.in_(ids), User.role == 'user').values(
+            id_proof=None, aadhar_proof=None, fir_receipt=None, approved=False)
+        error = None
+    updated = set(db.session.execute(statement.returning(User.id)).scalars()) if ids else set()
+    for user_id in updated:
+        announce(db.session, 'user', id=user_id, pending=False)
+    db.session.commit()
+    for user_id in updated:
+        invalidate_user(user_id)
+    missing = set(ids) - updated
+    # Staff accounts are not reviewed here, so their ids come back as not found
+    existing = set(db.session.execute(
+        db.select(User.id).where(User.id.in_(missing), User.role == 'user')
+    ).scalars()) if missing else set()
+    return bulk_results(ids, updated, existing, error)
+
+USER_ROLES = ('user', 'officer', 'do', 'head')
+LETTER_STATUSES = ('draft', 'submitted', 'officer_approved', 'officer_rejected', 'head_approved', 'head_rejected')
+USER_EXPORT_FIELDS = ['id', 'username', 'full_name', 'designation', 'role', 'approved', 'department', 'phone']
+LETTER_EXPORT_FIELDS = ['id', 'author', 'title', 'status', 'created_at', 'updated_at', 'officer', 'officer_remark',
+                        'head', 'head_remark', 'template', 'template_params', 'content', 'archived']
+
+def parse_flag(value):
+    return value if isinstance(value, bool) else str(value).strip().lower() in ('1', 'true', 'yes')
+
+def parse_timestamp(value, default):
+    # CSV carries ISO strings, JSONL may too; both parse the same way
+    return datetime.fromisoformat(value) if value else default
+
+def supported_hash(password_hash):
+    # method$salt$hash, with a method werkzeug can verify
+    parts = password_hash.split('$')
+    return len(parts) == 3 and all(parts) and parts[0].split(':', 1)[0] in ('scrypt', 'pbkdf2')
+
+USER_TEXT_FIELDS = ('username', 'full_name', 'designation', 'role', 'department', 'phone', 'password', 'password_hash')
+
+def user_row(record):
+    if record is None:
+        raise ValueError('not a valid record')
+    wrong = [field for field in USER_TEXT_FIELDS if record.get(field) is not None and not isinstance(record[field], str)]
+    if wrong:
+        raise ValueError(f"{', '.join(wrong)} must be text")
+    missing = [field for field in ('username', 'full_name', 'designation') if not record.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    role = record.get('role', 'user')
+    if role not in USER_ROLES:
+        raise ValueError(f'unknown role {role!r}')
+    if not (record.get('password') or record.get('password_hash')):
+        raise ValueError('needs a password or password_hash')
+    if record.get('password_hash') and not supported_hash(record['password_hash']):
+        raise ValueError('password_hash must be a scrypt or pbkdf2 hash')
+    return {
+        'username': record['username'],
+        'full_name': record['full_name'],
+        'designation': record['designation'],
+        'role': role,
+        'approved': parse_flag(record.get('approved', role != 'user')),
+        'profile_complete': parse_flag(record.get('profile_complete', role in ('officer', 'head'))),
+        'department': record.get('department'),
+        'phone': record.get('phone'),
+        'password': record.get('password'),
+        'password_hash': record.get('password_hash'),
+    }
+
+def import_users(records):
+    # Existing usernames are skipped, so rerunning an import only adds what is new
+    summary, errors = Counter(), []
+    for batch in batched(records, current_app.config['IMPORT_BATCH_SIZE']):
+        rows = []
+        usernames = {record['username'] for _, record in batch if record and isinstance(record.get('username'), str)}
+        existing = set(db.session.execute(db.select(User.username).where(User.username.in_(usernames))).scalars())
+        for line, record in batch:
+            try:
+                row = user_row(record)
+            except ValueError as error:
+                summary['rejected'] += 1
+                if len(errors) < current_app.config['IMPORT_ERROR_LIMIT']:
+                    errors.append(f'Line {line}: {error}')
+                continue
+            if row['username'] in existing:
+                summary['skipped'] += 1
+                continue
+            existing.add(row['username'])
+            rows.append(row)
+        plain_rows = [row for row in rows if not row['password_hash']]
+        hashes = password_hasher.hash_many([row['password'] for row in plain_rows])
+        for row, password_hash in zip(plain_rows, hashes):
+            row['password_hash'] = password_hash
+        for row in rows:
+            del row['password']
+        if rows:
+            db.session.execute(db.insert(User), rows)
         db.session.commit()
-        
-        login_user(new_user)
-        return redirect(url_for('profile'))
-    
-    return render_template('register.html')
-
-@app.route('/profile', methods=['GET', 'POST'])
-@login_required
-def profile():
-    if request.method == 'POST':
-        id_proof = request.files.get('id_proof')
-        aadhar_proof = request.files.get('aadhar_proof')
-        fir_receipt = request.files.get('fir_receipt')
-        
-        if id_proof:
-            current_user.id_proof = save_uploaded_file(id_proof)
-        if aadhar_proof:
-            current_user.aadhar_proof = save_uploaded_file(aadhar_proof)
-        if fir_receipt:
-            current_user.fir_receipt = save_uploaded_file(fir_receipt)
-        
+        summary['created'] += len(rows)
+    return summary, errors
+
+LETTER_TEXT_FIELDS = ('author', 'officer', 'head', 'title', 'content', 'status', 'template', 'officer_remark', 'head_remark')
+
+def letter_row(record, user_ids):
+    if record is None:
+        raise ValueError('not a valid record')
+    wrong = [field for field in LETTER_TEXT_FIELDS if record.get(field) is not None and not isinstance(record[field], str)]
+    if wrong:
+        raise ValueError(f"{', '.join(wrong)} must be text")
+    author = user_ids.get(record.get('author'))
+    if author is None:
+        raise ValueError(f"unknown author {record.get('author')!r}")
+    status = record.get('status', 'submitted')
+    if status not in LETTER_STATUSES:
+        raise ValueError(f'unknown status {status!r}')
+    template = record.get('template')
+    params = record.get('template_params')
+    if template:
+        if isinstance(params, str):
+            params = json.loads(params)
+        if template not in LETTER_TYPES or not isinstance(params, dict) or set(params) != {'full_name', 'designation'}:
+            raise ValueError('template letters need a known template and full_name/designation params')
+    elif not record.get('content'):
+        raise ValueError('needs content or a template')
+    reviewers = {}
+    for role in ('officer', 'head'):
+        if record.get(role):
+            reviewers[role] = user_ids.get(record[role])
+            if reviewers[role] is None:
+                raise ValueError(f'unknown {role} {record[role]!r}')
+    created_at = parse_timestamp(record.get('created_at'), datetime.utcnow())
+    return {
+        'user_id': author,
+        'title': record.get('title') or LETTER_TYPES.get(template, 'Letter'),
+        'content': record.get('content') or (render_letter(template, **params)
+                                             if template and current_app.config['STORE_LETTER_CONTENT'] else ''),
+        'status': status,
+        'created_at': created_at,
+        'updated_at': parse_timestamp(record.get('updated_at'), created_at),
+        'officer_id': reviewers.get('officer'),
+        'officer_remark': record.get('officer_remark'),
+        'head_id': reviewers.get('head'),
+        'head_remark': record.get('head_remark'),
+        'template': template or None,
+        'template_params': params if template else None,
+    }
+
+def import_letters(records):
+    # Authors and reviewers are matched by username; letters always get fresh ids
+    summary, errors = Counter(), []
+    for batch in batched(records, current_app.config['IMPORT_BATCH_SIZE']):
+        usernames = {record[field] for _, record in batch if record
+                     for field in ('author', 'officer', 'head') if isinstance(record.get(field), str)}
+        user_ids = dict(db.session.execute(db.select(User.username, User.id).where(User.username.in_(usernames))).all())
+        rows = []
+        for line, record in batch:
+            try:
+                rows.append(letter_row(record, user_ids))
+            except (ValueError, TypeError) as error:
+                summary['rejected'] += 1
+                if len(errors) < current_app.config['IMPORT_ERROR_LIMIT']:
+                    errors.append(f'Line {line}: {error}')
+        if rows:
+            # A bulk INSERT skips the mapper events, so the counters and search index are updated once per batch
+            ids = db.session.execute(db.insert(Letter).returning(Letter.id, sort_by_parameter_order=True), rows).scalars().all()
+            deltas = Counter(stat_key(row['status'], row['officer_id']) for row in rows)
+            decisions = [decision_latency(row['created_at'], row['updated_at']) for row in rows if row['status'] in FINAL_STATUSES]
+            record_letter_stats(db.session.connection(), deltas, decisions)
+            reindex_letters(ids)
         db.session.commit()
-        flash('Documents uploaded successfully!')
-        return redirect(url_for('pending_approval'))
-    
-    return render_template('profile.html')
-
-@app.route('/pending_approval')
-@login_required
-def pending_approval():
-    if current_user.approved:
-        return redirect_based_on_role(current_user)
-    return render_template('pending_approval.html')
-
-@app.route('/home')
-@login_required
-def home():
-    if not current_user.approved:
-        return redirect(url_for('pending_approval'))
-    if not current_user.has_submitted_docs():
-        return redirect(url_for('profile'))
-    return render_template('home.html')
-
-@app.route('/generate_letter/<letter_type>', methods=['GET', 'POST'])
-@login_required
-def generate_letter(letter_type):
-    if not current_user.approved:
-        return redirect(url_for('pending_approval'))
-    
-    # Define our sample letters
-    sample_letters = {
-        'permission': {
-            'title': 'Permission Letter for Event Participation',
-            'content': f"""To,
-The Authority Concerned
-[Organization Name]
-[Address]
+        summary['created'] += len(rows)
+    return summary, errors
 
-Subject: Request for Permission to Participate in [Event Name]
+def user_records(with_password_hashes=False):
+    columns = [getattr(User, field) for field in USER_EXPORT_FIELDS]
+    if with_password_hashes:
+        columns.append(User.password_hash)
+    rows = db.session.execute(db.select(*columns).order_by(User.id), execution_options={'yield_per': 1000})
+    for row in rows:
+        yield row._asdict()
 
-Dear Sir/Madam,
+def letter_records():
+    # Live letters first, then the archive; yield_per keeps one batch of rows in memory at a time
+    Head = db.aliased(User)
+    for model in (Letter, ArchivedLetter):
+        statement = (
+            db.select(model, Author.username, Officer.username, Head.username)
+            .join(Author, model.user_id == Author.id)
+            .outerjoin(Officer, model.officer_id == Officer.id)
+            .outerjoin(Head, model.head_id == Head.id)
+            .order_by(model.id)
+        )
+        for letter, author, officer, head in db.session.execute(statement, execution_options={'yield_per': 1000}):
+            yield {
+                'id': letter.id,
+                'author': author,
+                'title': letter.title,
+                'status': letter.status,
+                'created_at': letter.created_at,
+                'updated_at': letter.updated_at,
+                'officer': officer,
+                'officer_remark': letter.officer_remark,
+                'head': head,
+                'head_remark': letter.head_remark,
+                'template': letter.template,
+                'template_params': letter.template_params,
+                'content': letter.content,
+                'archived': model is ArchivedLetter,
+            }
 
-I, {current_user.full_name} ({current_user.designation}), would like to request permission to participate in [Event Name] scheduled on [Date]. 
+IMPORTERS = {'users': import_users, 'letters': import_letters}
+EXPORTERS = {'users': (USER_EXPORT_FIELDS, user_records), 'letters': (LETTER_EXPORT_FIELDS, letter_records)}
 
-I assure you that I will follow all the rules and regulations during the event. Kindly grant me permission to participate.
+def import_message(kind, summary):
+    return (f"Imported {summary['created']} {kind}: {summary['skipped']} already existed, "
+            f"{summary['rejected']} rejected.")
 
-Thanking you,
-Yours sincerely,
-{current_user.full_name}
-{current_user.designation}"""
-        },
-        'noc': {
-            'title': 'No Objection Certificate Request',
-            'content': f"""To,
-The Authority Concerned
-[Organization Name]
-[Address]
+@core.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_command(kind, path):
+    fmt = record_format(path)
+    if fmt is None:
+        raise click.BadParameter('expected a .csv or .jsonl file', param_hint='PATH')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        summary, errors = IMPORTERS[kind](read_records(f, fmt))
+    for error in errors:
+        click.echo(error, err=True)
+    click.echo(import_message(kind, summary))
 
-Subject: Request for No Objection Certificate
+@core.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(EXPORTERS)))
+@click.argument('path', default='-')
+@click.option('--format', 'fmt', type=click.Choice(sorted(RECORD_MIMETYPES)), help='Defaults to the extension of PATH.')
+@click.option('--with-password-hashes', is_flag=True, help='Include password hashes, for moving users between instances.')
+def export_command(kind, path, fmt, with_password_hashes):
+    fmt = fmt or record_format(path) or 'jsonl'
+    fields, records = EXPORTERS[kind]
+    if kind == 'users' and with_password_hashes:
+        fields, records = fields + ['password_hash'], lambda: user_records(with_password_hashes=True)
+    # Binary, so CSV line endings go out exactly as written
+    with click.open_file(path, 'wb') as f:
+        for chunk in write_records(records(), fmt, fields):
+            f.write(chunk.encode())
 
-Dear Sir/Madam,
+def letter_event_queue(event, user):
+    # The viewer's queue a letter now belongs in, mirroring letter_queue()
+    if user.role == 'officer':
+        if event['status'] == 'submitted':
+            return 'officer_pending'
+        if event['status'] in ('officer_approved', 'officer_rejected') and event['officer_id'] == user.id:
+            return 'officer_reviewed'
+    if user.role == 'head':
+        if event['status'] == 'officer_approved':
+            return 'head_pending'
+        if event['status'] in ('head_approved', 'head_rejected') and event['head_id'] == user.id:
+            return 'head_reviewed'
+    return None
 
-I, {current_user.full_name} ({current_user.designation}), am writing to request a No Objection Certificate for [Purpose]. 
+def dashboard_update(event, user):
+    # Every letter event removes the old row; rows that land in one of the viewer's queues come back rendered
+    if event['kind'] == 'letter':
+        update = {'id': event['id'], 'queue': letter_event_queue(event, user)}
+        if update['queue']:
+            row = db.session.execute(letter_rows().filter(Letter.id == event['id'])).first()
+            if row is None:
+                update['queue'] = None
+            else:
+                update['html'] = str(letter_fragment(f"{update['queue']}_row", LetterRow(*row)))
+        return 'letter', update
+    if event['kind'] == 'user' and user.role == 'head':
+        update = {'id': event['id']}
+        pending_user = db.session.get(User, event['id']) if event['pending'] else None
+        if pending_user is not None:
+            update['html'] = current_app.jinja_env.get_template('fragments/pending_user_row.html').render(user=pending_user)
+        return 'user', update
+    return None, None
 
-I would be grateful if you could issue the NOC at the earliest convenience.
+file_fingerprints = {}
 
-Thanking you,
-Yours sincerely,
-{current_user.full_name}
-{current_user.designation}"""
-        },
-        'leave': {
-            'title': 'Leave Application',
-            'content': f"""To,
-The Authority Concerned
-[Organization Name]
-[Address]
+def file_fingerprint(path):
+    # Content-addressed uploads already carry their sha256 in the name
+    digest = os.path.basename(path).rsplit('.', 1)[0]
+    if len(digest) == 64:
+        return digest
+    stat = os.stat(path)
+    cached = file_fingerprints.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(current_app.config['UPLOAD_CHUNK_SIZE']), b''):
+            sha.update(chunk)
+    file_fingerprints[path] = (stat.st_mtime_ns, stat.st_size, sha.hexdigest())
+    return sha.hexdigest()
 
-Subject: Application for Leave
+@core.app_template_global()
+def static_url(filename):
+    path = safe_join(current_app.config['STATIC_FOLDER'], filename)
+    return url_for('main.static_files', filename=filename, v=file_fingerprint(path)[:12])
 
-Dear Sir/Madam,
+class SchemaMigration(db.Model):
+    name = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-I, {current_user.full_name} ({current_user.designation}), would like to apply for leave from [Start Date] to [End Date] due to [Reason]. 
+def create_tables(*tables):
+    for table in tables:
+        table.create(db.session.connection(), checkfirst=True)
 
-I request you to kindly grant me leave for the mentioned period.
+def add_missing_columns(table):
+    existing = {column['name'] for column in db.inspect(db.session.connection()).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(db.engine.dialect)
+            db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
 
-Thanking you,
-Yours sincerely,
-{current_user.full_name}
-{current_user.designation}"""
-        }
-    }
-    
-    if letter_type not in sample_letters:
-        flash('Invalid letter type')
-        return redirect(url_for('home'))
-    
-    if request.method == 'POST':
-        # Create and submit the letter
-        letter = Letter(
-            title=sample_letters[letter_type]['title'],
-            content=sample_letters[letter_type]['content'],
-            user_id=current_user.id,
-            status='submitted'
-        )
-        db.session.add(letter)
+def migrate_base_tables():
+    create_tables(User.__table__, Letter.__table__, ArchivedLetter.__table__)
+
+def migrate_letter_templates():
+    add_missing_columns(Letter.__table__)
+
+def migrate_queue_indexes():
+    for index in Letter.__table__.indexes:
+        index.create(db.session.connection(), checkfirst=True)
+
+def migrate_letter_search():
+    if db.engine.dialect.name != 'sqlite':
+        return
+    connection = db.session.connection()
+    connection.execute(create_letter_fts)
+    for letter in Letter.query.yield_per(500):
+        index_letter(connection, letter)
+
+def migrate_letter_stats():
+    create_tables(LetterStat.__table__, ApprovalLatency.__table__)
+    reconcile_letter_stats()
+
+def migrate_letter_archive():
+    create_tables(ArchivedLetter.__table__)
+
+def migrate_password_hash_length():
+    # SQLite never enforced the old 128-character limit
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)'))
+
+def migrate_letter_search_content():
+    # PostgreSQL search reads the content column, so template letters written before it was stored get their body
+    if db.engine.dialect.name == 'sqlite':
+        return
+    letters = Letter.query.filter(Letter.template.isnot(None), Letter.content == '').yield_per(500)
+    for batch in batched(letters, 500):
+        db.session.execute(db.update(Letter), [{'id': letter.id, 'content': letter.body} for letter in batch])
+
+# Applied in order, once each; add new steps at the end
+MIGRATIONS = [
+    ('0001_base_tables', migrate_base_tables),
+    ('0002_letter_templates', migrate_letter_templates),
+    ('0003_queue_indexes', migrate_queue_indexes),
+    ('0004_letter_search', migrate_letter_search),
+    ('0005_letter_stats', migrate_letter_stats),
+    ('0006_letter_archive', migrate_letter_archive),
+    ('0007_password_hash_length', migrate_password_hash_length),
+    ('0008_letter_search_content', migrate_letter_search_content),
+]
+
+def migrate():
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = {migration.name for migration in SchemaMigration.query}
+    for name, step in MIGRATIONS:
+        if name in applied:
+            continue
+        step()
+        db.session.add(SchemaMigration(name=name))
         db.session.commit()
-        flash('Letter submitted for approval!')
-        return redirect(url_for('home'))
-    
-    # For GET request, show the letter preview
-    return render_template(
-        'generate_letter.html', 
-        letter=sample_letters[letter_type],
-        letter_type=letter_type,
-        now=datetime.now()
-    )
+        current_app.logger.info('Applied migration %s', name)
 
-@app.route('/view_letter/<int:letter_id>')
-@login_required
-def view_letter(letter_id):
-    letter = Letter.query.get_or_404(letter_id)
-    if not letter.can_view(current_user):
-        flash('You are not authorized to view this letter')
-        return redirect_based_on_role(current_user)
-    
-    # Store referrer URL - using Flask's built-in session
-    referrer = request.referrer
-    if referrer and ('head/dashboard' in referrer or 'officer/dashboard' in referrer):
-        session['previous_url'] = referrer  # Using Flask's native session
-    
-    return render_template('view_letter.html', letter=letter)
-@app.route('/logout')
-@login_required
-def logout():
-    logout_user()
-    return redirect(url_for('index'))
-
-@app.route('/head/dashboard')
-@login_required
-def head_dashboard():
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
-    
-    pending_letters = Letter.query.filter_by(status='officer_approved').order_by(Letter.created_at.desc()).all()
-    reviewed_letters = Letter.query.filter(
-        Letter.status.in_(['head_approved', 'head_rejected']),
-        Letter.head_id == current_user.id
-    ).order_by(Letter.updated_at.desc()).all()
-    pending_users = User.query.filter(
-        User.role == 'user',
-        User.approved == False,
-        db.or_(
-            User.id_proof.isnot(None),
-            User.aadhar_proof.isnot(None),
-            User.fir_receipt.isnot(None)
+@core.cli.command('migrate')
+def migrate_command():
+    migrate()
+    click.echo('Database schema is up to date.')
+
+def seed_accounts():
+    # Creates the head and sample DO accounts only when no account has that role yet
+    created = []
+    if not User.query.filter_by(role='head').first():
+        head = User(
+            username='head',
+            full_name='Senior DO',
+            designation='Head Department Officer',
+            role='head',
+            approved=True,
+            profile_complete=True
         )
-    ).all()
-    officers = User.query.filter_by(role='officer').all()
-    
-    return render_template('head_dashboard.html',
-                         pending_letters=pending_letters,
-                         reviewed_letters=reviewed_letters,
-                         pending_users=pending_users,
-                         officers=officers)
-
-@app.route('/head/approve_user/<int:user_id>')
-@login_required
-def head_approve_user(user_id):
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
-    
-    user = User.query.get_or_404(user_id)
-    if user.has_submitted_docs():
-        user.approved = True
-        db.session.commit()
-        flash(f'User {user.username} approved successfully!')
-    else:
-        flash('User has not submitted all documents', 'error')
-    return redirect(url_for('head_dashboard'))
-
-@app.route('/head/reject_user/<int:user_id>')
-@login_required
-def head_reject_user(user_id):
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
+        head.set_password('head123')
+        db.session.add(head)
+        created.append('head')
     
-    user = User.query.get_or_404(user_id)
-    user.id_proof = None
-    user.aadhar_proof = None
-    user.fir_receipt = None
-    user.approved = False
-    db.session.commit()
-    flash(f'User {user.username} documents rejected. Please resubmit.')
-    return redirect(url_for('head_dashboard'))
-
-@app.route('/head/create_do', methods=['GET', 'POST'])  
-@login_required
-def head_create_do():
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
-    
-    if request.method == 'POST':
-        username = request.form['username']
-        full_name = request.form['full_name']
-        designation = request.form['designation']
-        password = request.form['password']
-        
-        if User.query.filter_by(username=username).first():
-            flash('Username already exists')
-            return redirect(url_for('head_create_do'))
-        
-        new_do = User(
-            username=username,
-            full_name=full_name,
-            designation=designation,
-            role='do',  
+    if not User.query.filter_by(role='do').first():
+        do = User(
+            username='do',
+            full_name='Department Officer',
+            designation='DO',
+            role='do',
             approved=True,
-            profile_complete=False  # DO needs to complete profile
+            profile_complete=False
         )
-        new_do.set_password(password)
-        db.session.add(new_do)
-        db.session.commit()
-        flash('DO account created successfully!')
-        return redirect(url_for('head_dashboard'))
-    
-    return render_template('create_do.html')  
+        do.set_password('do123')
+        db.session.add(do)
+        created.append('do')
+    db.session.commit()
+    return created
 
-@app.route('/do/profile', methods=['GET', 'POST'])
-@login_required
-def do_profile():
-    if current_user.role != 'do' or current_user.profile_complete:
-        return redirect_based_on_role(current_user)
-    
-    if request.method == 'POST':
-        department = request.form['department']
-        phone = request.form['phone']
-        id_proof = request.files['id_proof']
-        aadhar_proof = request.files['aadhar_proof']
-        
-        # Save files and update user
-        current_user.department = department
-        current_user.phone = phone
-        current_user.id_proof = save_uploaded_file(id_proof)
-        current_user.aadhar_proof = save_uploaded_file(aadhar_proof)
-        current_user.profile_complete = True
-        
-        db.session.commit()
-        flash('Profile completed successfully!')
-        return redirect(url_for('do_dashboard'))
-    
-    return render_template('do_profile.html')
+@core.cli.command('seed')
+def seed_command():
+    migrate()
+    created = seed_accounts()
+    click.echo(f"Created the {' and '.join(created)} account(s)." if created else 'Seed accounts already exist.')
 
-@app.route('/head/approve_letter/<int:letter_id>', methods=['GET', 'POST'])
-@login_required
-def head_approve_letter(letter_id):
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
-    
-    letter = Letter.query.get_or_404(letter_id)
-    if letter.status != 'officer_approved':
-        flash('Letter is not in correct state for approval', 'error')
-        return redirect(url_for('head_dashboard'))
-    
-    if request.method == 'POST':
-        letter.status = 'head_approved'
-        letter.head_id = current_user.id
-        letter.head_remark = request.form.get('remark', '')
-        db.session.commit()
-        flash('Letter approved successfully!')
-        return redirect(url_for('head_dashboard'))
-    
-    return render_template('approve_letter.html', 
-                         letter=letter, 
-                         action='approve',
-                         role='head')
-
-@app.route('/head/reject_letter/<int:letter_id>', methods=['GET', 'POST'])
-@login_required
-def head_reject_letter(letter_id):
-    if current_user.role != 'head':
-        return redirect_based_on_role(current_user)
-    
-    letter = Letter.query.get_or_404(letter_id)
-    if letter.status != 'officer_approved':
-        flash('Letter is not in correct state for rejection', 'error')
-        return redirect(url_for('head_dashboard'))
-    
-    if request.method == 'POST':
-        remark = request.form.get('remark', '')
-        if not remark:
-            flash('Please provide a rejection remark', 'error')
-            return redirect(url_for('head_reject_letter', letter_id=letter_id))
-        
-        letter.status = 'head_rejected'
-        letter.head_id = current_user.id
-        letter.head_remark = remark
-        db.session.commit()
-        flash('Letter rejected successfully!')
-        return redirect(url_for('head_dashboard'))
-    
-    return render_template('approve_letter.html', 
-                         letter=letter, 
-                         action='reject',
-                         role='head')
-
-@app.route('/officer/dashboard')
-@login_required
-def officer_dashboard():
-    if current_user.role != 'officer':
-        return redirect_based_on_role(current_user)
-    
-    pending_letters = Letter.query.filter_by(status='submitted').order_by(Letter.created_at.desc()).all()
-    reviewed_letters = Letter.query.filter(
-        Letter.status.in_(['officer_approved', 'officer_rejected']),
-        Letter.officer_id == current_user.id
-    ).order_by(Letter.updated_at.desc()).all()
-    
-    return render_template('officer_dashboard.html',
-                         pending_letters=pending_letters,
-                         reviewed_letters=reviewed_letters)
-
-@app.route('/officer/approve_letter/<int:letter_id>', methods=['GET', 'POST'])
-@login_required
-def officer_approve_letter(letter_id):
-    if current_user.role != 'officer':
-        return redirect_based_on_role(current_user)
-    
-    letter = Letter.query.get_or_404(letter_id)
-    if letter.status != 'submitted':
-        flash('Letter is not in correct state for approval', 'error')
-        return redirect(url_for('officer_dashboard'))
-    
-    if request.method == 'POST':
-        remark = request.form.get('remark', '')
-        letter.status = 'officer_approved'
-        letter.officer_id = current_user.id
-        letter.officer_remark = remark
-        db.session.commit()
-        flash('Letter approved and sent to head for final review!')
-        return redirect(url_for('officer_dashboard'))
-    
-    return render_template('approve_reject_letter.html', 
-                         letter=letter, 
-                         action='approve',
-                         role='officer')
-
-@app.route('/officer/reject_letter/<int:letter_id>', methods=['GET', 'POST'])
-@login_required
-def officer_reject_letter(letter_id):
-    if current_user.role != 'officer':
-        return redirect_based_on_role(current_user)
-    
-    letter = Letter.query.get_or_404(letter_id)
-    if letter.status != 'submitted':
-        flash('Letter is not in correct state for rejection', 'error')
-        return redirect(url_for('officer_dashboard'))
+@core.cli.command('compile-templates')
+def compile_templates_command():
+    # Fills the bytecode cache ahead of time, e.g. during a deploy, so no worker compiles on its first requests
+    names = current_app.jinja_env.list_templates()
+    for name in names:
+        current_app.jinja_env.get_template(name)
+    click.echo(f'Compiled {len(names)} templates.')
+
+# Imported by create_app() rather than at module level, so importing the models stays cheap
+BLUEPRINTS = ['main_views', 'user_views', 'officer_views', 'head_views']
+
+def create_app(config=None):
+    # static_files serves /static itself, with fingerprints and ETags
+    app = Flask(__name__, static_folder=None)
+    configure(app)
+    app.config.update(config or {})
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Only SQLite's FTS index renders template letters; PostgreSQL search needs the body in the content column
+        app.config['STORE_LETTER_CONTENT'] = True
+    if app.config['JINJA_BYTECODE_CACHE']:
+        # Compiled templates are shared by every worker and survive restarts; edited templates recompile
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE'], exist_ok=True)
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE']))
+    for folder in [app.config['UPLOAD_FOLDER'], app.config['LETTER_FOLDER']]:
+        os.makedirs(folder, exist_ok=True)
+    app.session_interface = make_session_interface(app)
     
-    if request.method == 'POST':
-        remark = request.form.get('remark', '')
-        if not remark:
-            flash('Rejection remark is required', 'error')
-            return redirect(url_for('officer_reject_letter', letter_id=letter_id))
-        
-        letter.status = 'officer_rejected'
-        letter.officer_id = current_user.id
-        letter.officer_remark = remark
-        db.session.commit()
-        flash('Letter rejected successfully!')
-        return redirect(url_for('officer_dashboard'))
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT']
+    )
+    app.extensions['login_limiter'] = RateLimiter(*app.config['LOGIN_RATE_LIMIT'])
+    app.extensions['fragment_cache'] = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+    app.extensions['job_queue'] = JobQueue(app.config['JOB_QUEUE_PATH'], workers=app.config['JOB_WORKERS'],
+                                           retention=app.config['JOB_RETENTION'],
+                                           handlers=job_handlers, context=app.app_context)
+    app.extensions['event_bus'] = EventBus(app.config['EVENT_SOCKET_DIR'], max_queue=app.config['EVENT_QUEUE_SIZE'])
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    app.extensions['render_letter'] = letter_renderer(app.config['LETTER_TEMPLATE_FOLDER'], app.config['LETTER_CACHE_SIZE'])
+    app.before_request(app.extensions['job_queue'].start)
+    if app.config['INSTRUMENTATION']:
+        Instrumentation(app)
     
-    return render_template('approve_reject_letter.html', 
-                         letter=letter, 
-                         action='reject',
-                         role='officer')
-
-@app.route('/static/<path:filename>')
-def static_files(filename):
-    return send_from_directory('static', filename)
+    app.register_blueprint(core)
+    for name in BLUEPRINTS:
+        app.register_blueprint(import_module(name).bp)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
-        db.create_all()
-        # Create head if not exists
-        if not User.query.filter_by(role='head').first():
-            head = User(
-                username='head',
-                full_name='Senior DO',
-                designation='Head Department Officer',
-                role='head',
-                approved=True,
-                profile_complete=True
-            )
-            head.set_password('head123')
-            db.session.add(head)
-            db.session.commit()
-        
-        # Create sample DO if none exists
-        if not User.query.filter_by(role='do').first():
-            do = User(
-                username='do',
-                full_name='Department Officer',
-                designation='DO',
-                role='do',
-                approved=True,
-                profile_complete=False
-            )
-            do.set_password('do123')
-            db.session.add(do)
-            db.session.commit()
-    app.run(debug=True)
\ No newline at end of file
+        migrate()
+        seed_accounts()
+    app.run(debug=True)
@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+STATUSES = ['submitted', 'officer_approved', 'officer_rejected', 'head_approved', 'head_rejected']
+# Run in a fresh interpreter per sample, so nothing is already imported or compiled
+STARTUP_PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app({
+    'JOB_WORKERS': 0,
+    'JOB_QUEUE_PATH': os.path.join(sys.argv[1], 'jobs.db'),
+    'EVENT_SOCKET_DIR': os.path.join(sys.argv[1], 'events'),
+    'JINJA_BYTECODE_CACHE': os.path.join(sys.argv[1], 'jinja_cache'),
+    'SESSION_FILE_DIR': os.path.join(sys.argv[1], 'sessions'),
+})
+created = time.perf_counter()
+application.test_client().get('/login')
+print(json.dumps({'import': imported - started, 'create_app': created - imported, 'first_request': time.perf_counter() - created}))
+'''
+
+
+class NoRedirect(urlrequest.HTTPRedirectHandler):
+    # Time each route on its own instead of following the redirect to the next page
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class Client:
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urlrequest.build_opener(urlrequest.HTTPCookieProcessor(CookieJar()), NoRedirect)
+
+    def call(self, label, path, data=None, files=None):
+        body, headers = None, {}
+        if files:
+            body, headers['Content-Type'] = encode_multipart(data or {}, files)
+        elif data is not None:
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urlrequest.Request(self.base_url + path, data=body, headers=headers)
+        started = time.perf_counter()
+        try:
+            response = self.opener.open(req)
+            status = response.status
+            response.read()
+        except HTTPError as error:
+            response = error
+            status = error.code
+            error.read()
+        elapsed = time.perf_counter() - started
+        queries = response.headers.get('X-Query-Count')
+        self.recorder.record(label, elapsed, status, int(queries) if queries else None)
+        return status
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, label, elapsed, status, queries):
+        with self.lock:
+            self.samples[label].append((elapsed, status, queries))
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def seed(app_module, app, users, letters, reset=False):
+    db, User, Letter = app_module.db, app_module.User, app_module.Letter
+    with app.app_context():
+        # Seeding drops every table, so never do that to a database with accounts in it unless asked to
+        if not reset and db.inspect(db.engine).has_table('user') and db.session.query(User.id).first():
+            raise SystemExit(f'{db.engine.url.render_as_string()} already has users; pass --reset to wipe it before seeding')
+        db.drop_all()
+        app_module.migrate()
+        # One hash for every seeded account keeps seeding fast; logins still verify it for real
+        password_hash = app_module.password_hasher.hash('bench')
+        staff = [User(username='head', full_name='Bench Head', designation='Head', role='head',
+                      approved=True, profile_complete=True, password_hash=password_hash)]
+        staff += [User(username=f'officer{i}', full_name=f'Bench Officer {i}', designation='Officer', role='officer',
+                       approved=True, profile_complete=True, password_hash=password_hash)
+                  for i in range(max(users // 10, 1))]
+        db.session.add_all(staff)
+        authors = [User(username=f'user{i}', full_name=f'Bench User {i}', designation='Clerk', role='user',
+                        approved=True, fir_receipt='seed.pdf', password_hash=password_hash) for i in range(users)]
+        db.session.add_all(authors)
+        db.session.commit()
+
+        head = staff[0]
+        officers = staff[1:]
+        now = datetime.utcnow()
+        batch = []
+        for i in range(letters):
+            status = STATUSES[i % len(STATUSES)]
+            created_at = now - timedelta(minutes=random.randint(1, 60 * 24 * 60))
+            letter_type = random.choice(list(app_module.LETTER_TYPES))
+            author = random.choice(authors)
+            batch.append(Letter(
+                user_id=author.id, title=app_module.LETTER_TYPES[letter_type], content='',
+                template=letter_type, template_params={'full_name': author.full_name, 'designation': author.designation},
+                status=status, created_at=created_at, updated_at=created_at + timedelta(hours=random.randint(1, 72)),
+                officer_id=random.choice(officers).id if status != 'submitted' else None,
+                head_id=head.id if status.startswith('head_') else None,
+            ))
+            if len(batch) == 1000:
+                db.session.add_all(batch)
+                db.session.commit()
+                batch = []
+        db.session.add_all(batch)
+        db.session.commit()
+        app_module.reconcile_letter_stats()
+        return [officer.username for officer in officers]
+
+
+def latest_id(app, model, **filters):
+    with app.app_context():
+        row = model.query.filter_by(**filters).order_by(model.id.desc()).first()
+        return row.id if row else None
+
+
+def run_flow(app_module, app, base_url, recorder, officer_name, rounds):
+    head = Client(base_url, recorder)
+    officer = Client(base_url, recorder)
+    head.call('login', '/login', {'username': 'head', 'password': 'bench'})
+    officer.call('login', '/login', {'username': officer_name, 'password': 'bench'})
+    for _ in range(rounds):
+        author = Client(base_url, recorder)
+        username = f'bench-{uuid.uuid4().hex[:12]}'
+        author.call('register', '/register', {'username': username, 'full_name': 'Load Test', 'designation': 'Clerk', 'password': 'bench'})
+        author.call('profile', '/profile', files={'fir_receipt': ('fir.pdf', os.urandom(32 * 1024))})
+        user_id = latest_id(app, app_module.User, username=username)
+        head.call('head_approve_user', f'/head/approve_user/{user_id}')
+
+        author.call('generate_letter (GET)', '/generate_letter/leave')
+        author.call('generate_letter (POST)', '/generate_letter/leave', {})
+        letter_id = latest_id(app, app_module.Letter, user_id=user_id)
+
+        officer.call('officer_dashboard', '/officer/dashboard')
+        officer.call('officer_approve_letter', f'/officer/approve_letter/{letter_id}', {'remark': 'Checked'})
+        head.call('head_dashboard', '/head/dashboard')
+        head.call('head_approve_letter', f'/head/approve_letter/{letter_id}', {'remark': 'Approved'})
+
+
+def report(recorder, wall_time):
+    rows = []
+    total = 0
+    for label, samples in sorted(recorder.samples.items()):
+        latencies = [elapsed * 1000 for elapsed, _, _ in samples]
+        queries = [count for _, _, count in samples if count is not None]
+        errors = sum(1 for _, status, _ in samples if status >= 400)
+        total += len(samples)
+        rows.append({
+            'route': label,
+            'requests': len(samples),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': round(sum(queries) / len(queries), 1) if queries else None,
+        })
+    print(f"{'route':<26}{'reqs':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sql/req':>9}")
+    for row in rows:
+        print(f"{row['route']:<26}{row['requests']:>7}{row['errors']:>8}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{str(row['queries']):>9}")
+    print(f'\n{total} requests in {wall_time:.2f}s, {total / wall_time:.1f} req/s')
+    return {'routes': rows, 'requests': total, 'seconds': round(wall_time, 3), 'throughput': round(total / wall_time, 1)}
+
+
+def startup(runs, workdir):
+    samples = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, workdir], capture_output=True, text=True, check=True).stdout
+        samples['process'].append(time.perf_counter() - started)
+        for phase, elapsed in json.loads(output.splitlines()[-1]).items():
+            samples[phase].append(elapsed)
+    print(f"{'phase':<16}{'p50 ms':>10}{'max ms':>10}")
+    for phase in ['import', 'create_app', 'first_request', 'process']:
+        print(f'{phase:<16}{statistics.median(samples[phase]) * 1000:>10.1f}{max(samples[phase]) * 1000:>10.1f}')
+    return {phase: round(statistics.median(values), 4) for phase, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a database and load-test the letter approval workflow.')
+    parser.add_argument('--users', type=int, default=100, help='seeded user accounts')
+    parser.add_argument('--letters', type=int, default=5000, help='seeded letters, spread across every status')
+    parser.add_argument('--concurrency', type=int, default=8, help='simultaneous workflow clients')
+    parser.add_argument('--rounds', type=int, default=10, help='full workflows per client')
+    parser.add_argument('--database', help='database URL to seed (default: a throwaway SQLite file)')
+    parser.add_argument('--reset', action='store_true', help='drop every table in --database even if it already has users')
+    parser.add_argument('--startup', type=int, metavar='RUNS', help='only measure worker cold start over this many fresh processes')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='letter-bench-')
+    os.environ['DATABASE_URL'] = args.database or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    if args.startup:
+        results = startup(args.startup, workdir)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(dict(results, runs=args.startup), f, indent=2)
+        return
+    import app as app_module
+
+    app = app_module.create_app({
+        'TESTING': True,  # exposes X-Query-Count
+        'LOGIN_RATE_LIMIT': (10 ** 6, 60),
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'PDF_FOLDER': os.path.join(workdir, 'letter_pdfs'),
+        'SESSION_FILE_DIR': os.path.join(workdir, 'sessions'),
+        'JOB_QUEUE_PATH': os.path.join(workdir, 'jobs.db'),
+        'EVENT_SOCKET_DIR': os.path.join(workdir, 'events'),
+        'JINJA_BYTECODE_CACHE': os.path.join(workdir, 'jinja_cache'),
+    })
+
+    print(f"Seeding {args.users} users and {args.letters} letters into {os.environ['DATABASE_URL']}")
+    officers = seed(app_module, app, args.users, args.letters, args.reset)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    recorder = Recorder()
+    clients = [threading.Thread(target=run_flow, args=(app_module, app, base_url, recorder, officers[i % len(officers)], args.rounds))
+               for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    results = report(recorder, time.perf_counter() - started)
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, users=args.users, letters=args.letters, concurrency=args.concurrency), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from app import create_app, db, migrate
+
+
+# Every test using `app` runs on SQLite, and again on PostgreSQL when TEST_DATABASE_URL points at a throwaway database,
+# e.g. TEST_DATABASE_URL=postgresql://postgres@localhost/employee_test; its tables are dropped before and after each test
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def app(request, tmp_path):
+    if request.param == 'sqlite':
+        database_url = f"sqlite:///{tmp_path / 'site.db'}"
+    else:
+        database_url = os.environ.get('TEST_DATABASE_URL')
+        if not database_url:
+            pytest.skip('TEST_DATABASE_URL is not set')
+    app = create_app({
+        'TESTING': True,  # exposes X-Query-Count
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'PDF_FOLDER': str(tmp_path / 'letter_pdfs'),
+        'SESSION_FILE_DIR': str(tmp_path / 'sessions'),
+        'JOB_QUEUE_PATH': str(tmp_path / 'jobs.db'),
+        'JOB_WORKERS': 0,
+        'EVENT_SOCKET_DIR': str(tmp_path / 'events'),
+        'JINJA_BYTECODE_CACHE': None,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+    })
+    with app.app_context():
+        db.drop_all()
+        migrate()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
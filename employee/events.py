@@ -0,0 +1,96 @@
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+
+
+class EventBus:
+    # Delivers events to this process's subscribers and, over Unix datagram sockets, to sibling workers
+    def __init__(self, directory, max_queue=100):
+        self.directory = directory
+        self.max_queue = max_queue
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.started_pid = None
+        self.sender = None
+        self.address = None
+        os.makedirs(directory, exist_ok=True)
+
+    def subscribe(self):
+        self.start()
+        subscription = queue.Queue(self.max_queue)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def deliver(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                pass  # a stalled client misses updates rather than holding up the publisher
+
+    def publish(self, *events):
+        # Most commits announce nothing; they should not bind a socket or start the listener
+        if not events:
+            return
+        self.start()
+        for event in events:
+            self.deliver(event)
+        if self.sender is None:
+            return
+        messages = [json.dumps(event).encode() for event in events]
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if path == self.address or not name.endswith('.sock'):
+                continue
+            try:
+                for data in messages:
+                    self.sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self.unlink(path)  # the worker behind this socket has exited
+            except OSError:
+                pass
+
+    def unlink(self, address):
+        try:
+            os.remove(address)
+        except OSError:
+            pass
+
+    def listen(self, receiver):
+        while True:
+            try:
+                self.deliver(json.loads(receiver.recv(65536)))
+            except (OSError, ValueError):
+                continue
+
+    def start(self):
+        # Threads and sockets do not survive fork, so each worker process binds its own
+        if self.started_pid == os.getpid():
+            return
+        with self.lock:
+            if self.started_pid == os.getpid():
+                return
+            self.started_pid = os.getpid()
+            self.subscribers = set()
+            if not hasattr(socket, 'AF_UNIX'):
+                self.sender = None
+                return
+            self.address = os.path.join(self.directory, f'{os.getpid()}.sock')
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(self.address)
+            atexit.register(self.unlink, self.address)
+            self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sender.setblocking(False)
+        threading.Thread(target=self.listen, args=(receiver,), name='event-listener', daemon=True).start()
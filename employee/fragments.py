@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    # LRU of rendered HTML, bounded by the total characters it holds
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        if not self.max_size:
+            return render()
+        with self.lock:
+            fragment = self.entries.get(key)
+            if fragment is not None:
+                self.entries.move_to_end(key)
+                return fragment
+        fragment = render()
+        if len(fragment) > self.max_size:
+            return fragment
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = fragment
+            self.size += len(fragment)
+            while self.size > self.max_size:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
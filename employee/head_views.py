@@ -0,0 +1,212 @@
+import io
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, Response, stream_with_context
+from flask_login import login_required, current_user
+from records import RECORD_MIMETYPES, read_records, record_format, write_records
+from app import (EXPORTERS, IMPORTERS, Letter, User, announce_user, bulk_response, db, import_message, invalidate_user,
+                 letter_queue, letter_stats, paginate_letters, queue_letter_pdf, redirect_based_on_role, request_ids,
+                 request_remark, review_letters, review_users)
+
+bp = Blueprint('head', __name__)
+
+@bp.route('/head/dashboard')
+@login_required
+def dashboard():
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    pending_letters, pending_cursor = paginate_letters(
+        *letter_queue('head_pending', current_user), request.args.get('pending_cursor'))
+    reviewed_letters, reviewed_cursor = paginate_letters(
+        *letter_queue('head_reviewed', current_user), request.args.get('reviewed_cursor'))
+    pending_users = User.query.filter(
+        User.role == 'user',
+        User.approved == False,
+        db.or_(
+            User.id_proof.isnot(None),
+            User.aadhar_proof.isnot(None),
+            User.fir_receipt.isnot(None)
+        )
+    ).all()
+    officers = User.query.filter_by(role='officer').all()
+    
+    return render_template('head_dashboard.html',
+                         stats=letter_stats(officers),
+                         pending_letters=pending_letters,
+                         pending_cursor=pending_cursor,
+                         reviewed_letters=reviewed_letters,
+                         reviewed_cursor=reviewed_cursor,
+                         pending_users=pending_users,
+                         officers=officers)
+
+@bp.route('/head/approve_user/<int:user_id>')
+@login_required
+def approve_user(user_id):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    user = User.query.get_or_404(user_id)
+    if user.has_submitted_docs():
+        user.approved = True
+        announce_user(db.session, user)
+        db.session.commit()
+        invalidate_user(user.id)
+        flash(f'User {user.username} approved successfully!')
+    else:
+        flash('User has not submitted all documents', 'error')
+    return redirect(url_for('head.dashboard'))
+
+@bp.route('/head/reject_user/<int:user_id>')
+@login_required
+def reject_user(user_id):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    user = User.query.get_or_404(user_id)
+    user.id_proof = None
+    user.aadhar_proof = None
+    user.fir_receipt = None
+    user.approved = False
+    announce_user(db.session, user)
+    db.session.commit()
+    invalidate_user(user.id)
+    flash(f'User {user.username} documents rejected. Please resubmit.')
+    return redirect(url_for('head.dashboard'))
+
+@bp.route('/head/users/bulk/<action>', methods=['POST'])
+@login_required
+def bulk_users(action):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    if action not in ('approve', 'reject'):
+        abort(404)
+    
+    return bulk_response(review_users(request_ids(), action), 'head.dashboard')
+
+@bp.route('/head/export/<kind>.<fmt>')
+@login_required
+def export(kind, fmt):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    if kind not in EXPORTERS or fmt not in RECORD_MIMETYPES:
+        abort(404)
+    
+    fields, records = EXPORTERS[kind]
+    return Response(stream_with_context(write_records(records(), fmt, fields)), mimetype=RECORD_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
+@bp.route('/head/import/<kind>', methods=['POST'])
+@login_required
+def import_records(kind):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    if kind not in IMPORTERS:
+        abort(404)
+    
+    upload = request.files.get('file')
+    fmt = record_format(upload.filename) if upload else None
+    if fmt is None:
+        flash('Please upload a .csv or .jsonl file', 'error')
+        return redirect(url_for('head.dashboard'))
+    # Parsed straight off the upload stream, one batch at a time
+    summary, errors = IMPORTERS[kind](read_records(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), fmt))
+    flash(import_message(kind, summary), 'success' if summary['created'] else 'error')
+    for error in errors:
+        flash(error, 'error')
+    return redirect(url_for('head.dashboard'))
+
+@bp.route('/head/create_do', methods=['GET', 'POST'])  
+@login_required
+def create_do():
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        full_name = request.form['full_name']
+        designation = request.form['designation']
+        password = request.form['password']
+        
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists')
+            return redirect(url_for('head.create_do'))
+        
+        new_do = User(
+            username=username,
+            full_name=full_name,
+            designation=designation,
+            role='do',  
+            approved=True,
+            profile_complete=False  # DO needs to complete profile
+        )
+        new_do.set_password(password)
+        db.session.add(new_do)
+        db.session.commit()
+        flash('DO account created successfully!')
+        return redirect(url_for('head.dashboard'))
+    
+    return render_template('create_do.html')  
+
+@bp.route('/head/approve_letter/<int:letter_id>', methods=['GET', 'POST'])
+@login_required
+def approve_letter(letter_id):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    letter = Letter.query.get_or_404(letter_id)
+    if letter.status != 'officer_approved':
+        flash('Letter is not in correct state for approval', 'error')
+        return redirect(url_for('head.dashboard'))
+    
+    if request.method == 'POST':
+        letter.status = 'head_approved'
+        letter.head_id = current_user.id
+        letter.head_remark = request.form.get('remark', '')
+        db.session.commit()
+        queue_letter_pdf(letter.id)
+        flash('Letter approved successfully!')
+        return redirect(url_for('head.dashboard'))
+    
+    return render_template('approve_letter.html', 
+                         letter=letter, 
+                         action='approve',
+                         role='head')
+
+@bp.route('/head/reject_letter/<int:letter_id>', methods=['GET', 'POST'])
+@login_required
+def reject_letter(letter_id):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    
+    letter = Letter.query.get_or_404(letter_id)
+    if letter.status != 'officer_approved':
+        flash('Letter is not in correct state for rejection', 'error')
+        return redirect(url_for('head.dashboard'))
+    
+    if request.method == 'POST':
+        remark = request.form.get('remark', '')
+        if not remark:
+            flash('Please provide a rejection remark', 'error')
+            return redirect(url_for('head.reject_letter', letter_id=letter_id))
+        
+        letter.status = 'head_rejected'
+        letter.head_id = current_user.id
+        letter.head_remark = remark
+        db.session.commit()
+        flash('Letter rejected successfully!')
+        return redirect(url_for('head.dashboard'))
+    
+    return render_template('approve_letter.html', 
+                         letter=letter, 
+                         action='reject',
+                         role='head')
+
+@bp.route('/head/letters/bulk/<action>', methods=['POST'])
+@login_required
+def bulk_letters(action):
+    if current_user.role != 'head':
+        return redirect_based_on_role(current_user)
+    if action not in ('approve', 'reject'):
+        abort(404)
+    
+    results = review_letters(request_ids(), current_user, action, request_remark())
+    return bulk_response(results, 'head.dashboard')
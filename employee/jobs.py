@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+
+
+class JobQueue:
+    # Durable queue in a SQLite file; every process runs a few worker threads that claim jobs atomically
+    def __init__(self, path, workers=2, max_attempts=3, poll_interval=2.0, stale_after=600, retention=7 * 24 * 3600,
+                 handlers=None, context=None):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self.handlers = dict(handlers or {})
+        self.context = context or nullcontext  # e.g. app.app_context, entered around every job
+        self.local = threading.local()
+        self.wakeup = threading.Event()
+        self.started_pid = None
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job ('
+                'id INTEGER PRIMARY KEY, kind TEXT NOT NULL, key TEXT, payload TEXT NOT NULL, '
+                "status TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0, "
+                'run_after REAL NOT NULL, claimed_at REAL, error TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_job_status_run_after ON job (status, run_after)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_job_kind_key ON job (kind, key)')
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+        return conn
+
+    def enqueue(self, kind, payload, key=None, run_at=None):
+        # A queued job with the same key already covers this work
+        with self.connect() as conn:
+            if key is not None:
+                row = conn.execute(
+                    "SELECT id FROM job WHERE kind = ? AND key = ? AND status IN ('queued', 'running')", (kind, key)
+                ).fetchone()
+                if row:
+                    return row[0]
+            job_id = conn.execute(
+                'INSERT INTO job (kind, key, payload, run_after) VALUES (?, ?, ?, ?)',
+                (kind, key, json.dumps(payload), run_at or time.time())
+            ).lastrowid
+        self.start()
+        self.wakeup.set()
+        return job_id
+
+    def claim(self):
+        now = time.time()
+        with self.connect() as conn:
+            # Jobs whose worker died mid-run go back to the queue
+            conn.execute(
+                "UPDATE job SET status = 'queued' WHERE status = 'running' AND claimed_at < ?",
+                (now - self.stale_after,)
+            )
+            # Finished jobs are only kept for a while, so the file does not grow with every letter and upload
+            conn.execute("DELETE FROM job WHERE status = 'done' AND run_after < ?", (now - self.retention,))
+            return conn.execute(
+                "UPDATE job SET status = 'running', claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM job WHERE status = 'queued' AND run_after <= ? ORDER BY id LIMIT 1) "
+                'RETURNING id, kind, payload, attempts',
+                (now, now)
+            ).fetchone()
+
+    def finish(self, job_id, attempts, error=None):
+        with self.connect() as conn:
+            if error is None:
+                conn.execute("UPDATE job SET status = 'done', error = NULL WHERE id = ?", (job_id,))
+            elif attempts < self.max_attempts:
+                conn.execute(
+                    "UPDATE job SET status = 'queued', run_after = ?, error = ? WHERE id = ?",
+                    (time.time() + 2 ** attempts, error, job_id)
+                )
+            else:
+                conn.execute("UPDATE job SET status = 'failed', error = ? WHERE id = ?", (error, job_id))
+
+    def run_once(self):
+        job = self.claim()
+        if job is None:
+            return False
+        job_id, kind, payload, attempts = job
+        try:
+            with self.context():
+                self.handlers[kind](json.loads(payload))
+        except Exception as error:
+            self.finish(job_id, attempts, repr(error))
+        else:
+            self.finish(job_id, attempts)
+        return True
+
+    def work(self):
+        while True:
+            try:
+                if self.run_once():
+                    continue
+            except sqlite3.Error:
+                pass
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def start(self):
+        # Threads do not survive fork, so each worker process starts its own pool
+        if self.started_pid == os.getpid():
+            return
+        with self.lock:
+            if self.started_pid == os.getpid() or not self.workers:
+                return
+            self.started_pid = os.getpid()
+        for number in range(self.workers):
+            threading.Thread(target=self.work, name=f'job-worker-{number}', daemon=True).start()
@@ -0,0 +1,210 @@
+import os
+import json
+import mimetypes
+import queue
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, send_file, jsonify, abort, Response, stream_with_context
+from flask_login import logout_user, login_required, current_user
+from werkzeug.utils import safe_join
+from passwords import HasherBusy
+from app import (User, dashboard_update, db, event_bus, file_fingerprint, find_letter, letter_pdf_path, letter_queue,
+                 letter_summary, log_in, login_limiter, paginate_letters, password_hasher, queue_letter_pdf,
+                 redirect_based_on_role, search_letters)
+
+bp = Blueprint('main', __name__)
+
+@bp.app_errorhandler(HasherBusy)
+def hasher_busy(error):
+    # Raised from login, register, profile and staff forms alike, so send them back to the form they submitted
+    return render_template('busy.html', retry_url=request.path), 503, {'Retry-After': '5'}
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect_based_on_role(current_user)
+    return render_template('index.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect_based_on_role(current_user)
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        if not login_limiter.hit(username):
+            flash('Too many login attempts. Please wait a minute and try again.')
+            return render_template('login.html'), 429
+        user = User.query.filter_by(username=username).first()
+        
+        if user and user.check_password(password):
+            if password_hasher.needs_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
+            login_limiter.reset(username)
+            log_in(user)
+            return redirect_based_on_role(user)
+        else:
+            flash('Invalid username or password')
+    
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect_based_on_role(current_user)
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        full_name = request.form['full_name']
+        designation = request.form['designation']
+        password = request.form['password']
+        
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists')
+            return redirect(url_for('main.register'))
+        
+        new_user = User(
+            username=username,
+            full_name=full_name,
+            designation=designation,
+            role='user'
+        )
+        new_user.set_password(password)
+        db.session.add(new_user)
+        db.session.commit()
+        
+        log_in(new_user)
+        return redirect(url_for('user.profile'))
+    
+    return render_template('register.html')
+
+@bp.route('/view_letter/<int:letter_id>')
+@login_required
+def view_letter(letter_id):
+    letter = find_letter(letter_id)
+    if letter is None:
+        abort(404)
+    if not letter.can_view(current_user):
+        flash('You are not authorized to view this letter')
+        return redirect_based_on_role(current_user)
+    
+    # Send the Back buttons to the dashboard we came from, without a session write
+    referrer = request.referrer
+    if referrer and ('head/dashboard' in referrer or 'officer/dashboard' in referrer):
+        back_url = referrer
+    elif current_user.role in ('head', 'officer'):
+        back_url = url_for(f'{current_user.role}.dashboard')
+    else:
+        back_url = url_for('user.home')
+    
+    return render_template('view_letter.html', letter=letter, back_url=back_url)
+
+@bp.route('/letters/<int:letter_id>/pdf')
+@login_required
+def download_letter_pdf(letter_id):
+    letter = find_letter(letter_id)
+    if letter is None:
+        abort(404)
+    if not letter.can_view(current_user):
+        flash('You are not authorized to view this letter')
+        return redirect_based_on_role(current_user)
+    if letter.status != 'head_approved':
+        abort(404)
+    
+    path = letter_pdf_path(letter)
+    if os.path.exists(path):
+        return send_file(path, mimetype='application/pdf', download_name=f'letter_{letter.id}.pdf',
+                         etag=os.path.basename(path), conditional=True)
+    queue_letter_pdf(letter.id)
+    flash('The PDF is being prepared. Please try again in a moment.')
+    return redirect(url_for('main.view_letter', letter_id=letter.id))
+
+@bp.route('/search')
+@login_required
+def search():
+    terms = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_more = search_letters(terms, current_user, page)
+    return render_template('search.html', terms=terms, page=page, results=results, has_more=has_more)
+
+@bp.route('/letters/search')
+@login_required
+def search_letters_page():
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_more = search_letters(request.args.get('q', '').strip(), current_user, page)
+    return jsonify(
+        letters=[dict(letter_summary(letter), snippet=str(snippet)) for letter, snippet in results],
+        has_more=has_more
+    )
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('main.index'))
+
+@bp.route('/letters/queue/<queue>')
+@login_required
+def letter_queue_page(queue):
+    query, column = letter_queue(queue, current_user)
+    if query is None:
+        abort(404)
+    letters, next_cursor = paginate_letters(query, column, request.args.get('cursor'))
+    return jsonify(letters=[letter_summary(letter) for letter in letters], next_cursor=next_cursor)
+
+@bp.route('/events')
+@login_required
+def event_stream():
+    if current_user.role not in ('head', 'officer'):
+        abort(403)
+    user = current_user._get_current_object()
+    subscription = event_bus.subscribe()
+    
+    # Each open dashboard holds a worker thread, so run threaded or with an async worker class
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscription.get(timeout=current_app.config['EVENT_KEEPALIVE'])
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                name, update = dashboard_update(event, user)
+                db.session.close()  # hand the connection back between events
+                if name:
+                    yield f'event: {name}\ndata: {json.dumps(update)}\n\n'
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/static/<path:filename>')
+def static_files(filename):
+    path = safe_join(current_app.config['STATIC_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    
+    etag = file_fingerprint(path)
+    # Uploads are users' identity documents: browsers may keep them, shared caches and CDNs must not
+    private = os.path.relpath(path, current_app.config['STATIC_FOLDER']).split(os.sep)[0] == 'uploads'
+    immutable = not private and request.args.get('v') == etag[:12]
+    max_age = current_app.config['STATIC_IMMUTABLE_MAX_AGE' if immutable else 'STATIC_MAX_AGE']
+    
+    if current_app.config['X_ACCEL_REDIRECT_PREFIX']:
+        # nginx streams the file and handles Range itself
+        response = current_app.response_class(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = current_app.config['X_ACCEL_REDIRECT_PREFIX'] + filename
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        response = send_file(path, etag=etag, max_age=max_age, conditional=True)
+    if private:
+        response.cache_control.public = False  # send_file marks everything public
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.immutable = immutable
+    response.cache_control.max_age = max_age
+    return response
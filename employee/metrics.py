@@ -0,0 +1,212 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def label_text(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        return [f'{self.name}{label_text(self.labels, key)} {value}' for key, value in values]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self.values[labels] = (counts, total + value)
+
+    def render(self):
+        with self.lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{label_text(self.labels + ('le',), key + (bound,))} {cumulative}")
+            lines.append(f'{self.name}_sum{label_text(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{label_text(self.labels, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    # Process-local; with several workers, scrape each one or aggregate upstream
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    # Installs its hooks only when constructed, so a disabled app pays nothing
+    def __init__(self, app):
+        self.app = app
+        self.slow_request = app.config['SLOW_REQUEST_THRESHOLD']
+        self.slow_query = app.config['SLOW_QUERY_THRESHOLD']
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.profile_folder = app.config['PROFILE_FOLDER']
+        self.token = app.config['METRICS_TOKEN']
+        # cProfile cannot run two profilers at once, so at most one request is sampled at a time
+        self.profile_lock = threading.Lock()
+
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter('http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+        self.latency = self.registry.histogram('http_request_duration_seconds', 'Request latency', ('endpoint',))
+        self.statements = self.registry.histogram(
+            'db_statements_per_request', 'SQL statements issued per request', ('endpoint',), COUNT_BUCKETS
+        )
+        self.statement_time = self.registry.histogram('db_statement_duration_seconds', 'SQL statement latency', ('endpoint',))
+        self.render_time = self.registry.histogram('template_render_duration_seconds', 'Template render time', ('template',))
+        self.profiles = self.registry.counter('slow_request_profiles_total', 'Profiles dumped for slow requests', ('endpoint',))
+
+        # Run first on the way in and last on the way out, so the timing covers the other hooks
+        app.before_request_funcs.setdefault(None, []).insert(0, self.start_request)
+        app.after_request_funcs.setdefault(None, []).insert(0, self.finish_request)
+        app.teardown_request(self.stop_profiler)
+        event.listen(Engine, 'before_cursor_execute', self.start_statement)
+        event.listen(Engine, 'after_cursor_execute', self.finish_statement)
+        event.listen(Engine, 'handle_error', self.failed_statement)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['instrumentation'] = self
+
+    def endpoint(self):
+        # Unmatched URLs share one label so 404 scans cannot blow up the series count
+        if has_request_context():
+            return request.endpoint or 'unmatched'
+        return 'background'
+
+    def start_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.render_time = 0.0
+        if self.sample_rate and random.random() < self.sample_rate and self.profile_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def finish_request(self, response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = self.endpoint()
+        self.requests.inc(endpoint, request.method, str(response.status_code))
+        self.latency.observe(elapsed, endpoint)
+        self.statements.observe(g.sql_count, endpoint)
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={g.sql_time * 1000:.1f};desc="{g.sql_count} queries", '
+            f'tpl;dur={g.render_time * 1000:.1f}'
+        )
+        if elapsed >= self.slow_request:
+            self.app.logger.warning('Slow request %s %s took %.3fs (%d queries)', request.method, request.path, elapsed, g.sql_count)
+        return response
+
+    def stop_profiler(self, exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        self.profile_lock.release()
+        elapsed = time.perf_counter() - g.request_started
+        if elapsed < self.slow_request:
+            return
+        # .prof files open in snakeviz, flameprof or pstats
+        endpoint = re.sub(r'[^\w.-]', '_', self.endpoint())
+        os.makedirs(self.profile_folder, exist_ok=True)
+        path = os.path.join(self.profile_folder, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{endpoint}-{int(elapsed * 1000)}ms.prof')
+        profiler.dump_stats(path)
+        self.profiles.inc(self.endpoint())
+        self.app.logger.info('Profiled slow request %s into %s', request.path, path)
+
+    def start_statement(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('statement_started', []).append(time.perf_counter())
+
+    def finish_statement(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['statement_started'].pop()
+        elapsed = time.perf_counter() - started
+        self.statement_time.observe(elapsed, self.endpoint())
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_time += elapsed
+        if elapsed >= self.slow_query:
+            self.app.logger.warning('Slow query (%.3fs) in %s: %s', elapsed, self.endpoint(), statement)
+
+    def failed_statement(self, context):
+        started = context.connection.info.get('statement_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def start_render(self, sender, template, context, **extra):
+        g.setdefault('render_started', []).append(time.perf_counter())
+
+    def finish_render(self, sender, template, context, **extra):
+        elapsed = time.perf_counter() - g.render_started.pop()
+        self.render_time.observe(elapsed, template.name or 'string')
+        if 'render_time' in g:
+            g.render_time += elapsed
+
+    def metrics_view(self):
+        if self.token and request.headers.get('Authorization') != f'Bearer {self.token}':
+            abort(401)
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,88 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask_login import login_required, current_user
+from app import (Letter, bulk_response, db, letter_queue, paginate_letters, redirect_based_on_role, request_ids,
+                 request_remark, review_letters)
+
+bp = Blueprint('officer', __name__)
+
+@bp.route('/officer/dashboard')
+@login_required
+def dashboard():
+    if current_user.role != 'officer':
+        return redirect_based_on_role(current_user)
+    
+    pending_letters, pending_cursor = paginate_letters(
+        *letter_queue('officer_pending', current_user), request.args.get('pending_cursor'))
+    reviewed_letters, reviewed_cursor = paginate_letters(
+        *letter_queue('officer_reviewed', current_user), request.args.get('reviewed_cursor'))
+    
+    return render_template('officer_dashboard.html',
+                         pending_letters=pending_letters,
+                         pending_cursor=pending_cursor,
+                         reviewed_letters=reviewed_letters,
+                         reviewed_cursor=reviewed_cursor)
+
+@bp.route('/officer/letters/bulk/<action>', methods=['POST'])
+@login_required
+def bulk_letters(action):
+    if current_user.role != 'officer':
+        return redirect_based_on_role(current_user)
+    if action not in ('approve', 'reject'):
+        abort(404)
+    
+    results = review_letters(request_ids(), current_user, action, request_remark())
+    return bulk_response(results, 'officer.dashboard')
+
+@bp.route('/officer/approve_letter/<int:letter_id>', methods=['GET', 'POST'])
+@login_required
+def approve_letter(letter_id):
+    if current_user.role != 'officer':
+        return redirect_based_on_role(current_user)
+    
+    letter = Letter.query.get_or_404(letter_id)
+    if letter.status != 'submitted':
+        flash('Letter is not in correct state for approval', 'error')
+        return redirect(url_for('officer.dashboard'))
+    
+    if request.method == 'POST':
+        remark = request.form.get('remark', '')
+        letter.status = 'officer_approved'
+        letter.officer_id = current_user.id
+        letter.officer_remark = remark
+        db.session.commit()
+        flash('Letter approved and sent to head for final review!')
+        return redirect(url_for('officer.dashboard'))
+    
+    return render_template('approve_reject_letter.html', 
+                         letter=letter, 
+                         action='approve',
+                         role='officer')
+
+@bp.route('/officer/reject_letter/<int:letter_id>', methods=['GET', 'POST'])
+@login_required
+def reject_letter(letter_id):
+    if current_user.role != 'officer':
+        return redirect_based_on_role(current_user)
+    
+    letter = Letter.query.get_or_404(letter_id)
+    if letter.status != 'submitted':
+        flash('Letter is not in correct state for rejection', 'error')
+        return redirect(url_for('officer.dashboard'))
+    
+    if request.method == 'POST':
+        remark = request.form.get('remark', '')
+        if not remark:
+            flash('Rejection remark is required', 'error')
+            return redirect(url_for('officer.reject_letter', letter_id=letter_id))
+        
+        letter.status = 'officer_rejected'
+        letter.officer_id = current_user.id
+        letter.officer_remark = remark
+        db.session.commit()
+        flash('Letter rejected successfully!')
+        return redirect(url_for('officer.dashboard'))
+    
+    return render_template('approve_reject_letter.html', 
+                         letter=letter, 
+                         action='reject',
+                         role='officer')
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    # Runs scrypt/pbkdf2 in a bounded process pool so request threads only wait on the result
+    def __init__(self, method, workers=None, max_pending=None, queue_timeout=2.0):
+        self.method = method
+        self.workers = os.cpu_count() if workers is None else workers
+        self.slots = threading.BoundedSemaphore(max_pending or max(self.workers, 1) * 4)
+        self.queue_timeout = queue_timeout
+        self.executor = None
+        self.executor_pid = None
+        self.lock = threading.Lock()
+
+    def pool(self):
+        # Pools do not survive fork, so each worker process builds its own
+        with self.lock:
+            if self.executor_pid != os.getpid():
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                self.executor_pid = os.getpid()
+            return self.executor
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy()
+        try:
+            return self.pool().submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        # Every hash takes a slot as hash() does, so logins wait behind at most max_pending import hashes
+        if not self.workers:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        futures = []
+        for password in passwords:
+            if not self.slots.acquire(timeout=self.queue_timeout):
+                raise HasherBusy()
+            future = self.pool().submit(generate_password_hash, password, self.method)
+            future.add_done_callback(lambda future: self.slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+
+class RateLimiter:
+    # Sliding window of attempt timestamps per key
+    def __init__(self, limit, window, max_keys=10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.attempts) >= self.max_keys:
+                self.attempts = {k: v for k, v in self.attempts.items() if v and v[-1] > now - self.window}
+            attempts = self.attempts.setdefault(key, deque())
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.limit:
+                return False
+            attempts.append(now)
+            return True
+
+    def reset(self, key):
+        with self.lock:
+            self.attempts.pop(key, None)
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import textwrap
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+LEADING = 15
+WRAP_WIDTH = 88  # characters of 11pt Helvetica across the text column
+COLOR_SPACES = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}
+
+
+def jpeg_info(data):
+    # Width, height and component count from the first SOFn marker
+    i = 2
+    while i < len(data) - 9:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height, data[i + 9]
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    raise ValueError('Not a JPEG image')
+
+
+def escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def layout(blocks):
+    # blocks are (style, text) pairs; style is 'title', 'heading' or 'text'
+    lines = []
+    for style, text in blocks:
+        for paragraph in text.splitlines() or ['']:
+            wrapped = textwrap.wrap(paragraph, WRAP_WIDTH) or ['']
+            lines.extend((style, line) for line in wrapped)
+    return lines
+
+
+def write_pdf(path, blocks, logo=None):
+    fonts = {'title': ('/F2', 14), 'heading': ('/F2', 11), 'text': ('/F1', 11)}
+    lines = layout(blocks)
+    image = None
+    if logo:
+        with open(logo, 'rb') as f:
+            image = f.read()
+        width, height, components = jpeg_info(image)
+        logo_height = 48
+        logo_width = width * logo_height / height
+
+    top = PAGE_HEIGHT - MARGIN
+    per_page = int((top - MARGIN) // LEADING)
+    first_page = per_page - (int(logo_height // LEADING) + 2 if image else 0)
+    pages = [lines[:first_page]]
+    rest = lines[first_page:]
+    while rest:
+        pages.append(rest[:per_page])
+        rest = rest[per_page:]
+
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    regular = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    bold = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+    if image:
+        xobject = add(
+            f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/ColorSpace {COLOR_SPACES[components]} /BitsPerComponent 8 /Filter /DCTDecode '
+            f'/Length {len(image)} >>\nstream\n'.encode() + image + b'\nendstream'
+        )
+
+    page_ids = []
+    for number, page_lines in enumerate(pages):
+        ops = []
+        y = top
+        if image and number == 0:
+            ops.append(f'q {logo_width:.2f} 0 0 {logo_height} {MARGIN} {y - logo_height} cm /Im1 Do Q')
+            y -= logo_height + 2 * LEADING
+        for style, text in page_lines:
+            font, size = fonts[style]
+            ops.append(f'BT {font} {size} Tf {MARGIN} {y} Td ({escape(text)}) Tj ET')
+            y -= LEADING
+        stream = '\n'.join(ops).encode('cp1252', 'replace')  # WinAnsiEncoding
+        content = add(f'<< /Length {len(stream)} >>\nstream\n'.encode() + stream + b'\nendstream')
+        resources = f'/Font << /F1 {regular} 0 R /F2 {bold} 0 R >>'
+        if image:
+            resources += f' /XObject << /Im1 {xobject} 0 R >>'
+        page_ids.append(add(
+            f'<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << {resources} >> /Contents {content} 0 R >>'.encode()
+        ))
+
+    objects[catalog - 1] = f'<< /Type /Catalog /Pages {page_tree} 0 R >>'.encode()
+    kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+    objects[page_tree - 1] = f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode()
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(out)
+    os.replace(temp_path, path)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from importlib.util import find_spec
+
+# Both are optional: without Pillow there are no previews, without pypdfium2 none for PDFs.
+# They are imported on first use, so processes that never render a preview do not pay for them.
+HAS_PILLOW = find_spec('PIL') is not None
+HAS_PDFIUM = find_spec('pypdfium2') is not None
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+
+def can_preview(path):
+    extension = path.rsplit('.', 1)[-1].lower()
+    if not HAS_PILLOW:
+        return False
+    return extension in IMAGE_EXTENSIONS or (extension == 'pdf' and HAS_PDFIUM)
+
+
+def first_page(path, size):
+    from PIL import Image, ImageOps
+    if path.lower().endswith('.pdf'):
+        import pypdfium2
+        document = pypdfium2.PdfDocument(path)
+        try:
+            page = document[0]
+            # Rasterise straight at thumbnail scale rather than rendering the full page
+            return page.render(scale=size / max(page.get_size())).to_pil()
+        finally:
+            document.close()
+    image = Image.open(path)
+    image.draft('RGB', (size, size))  # lets JPEG decode at a fraction of full resolution
+    return ImageOps.exif_transpose(image)
+
+
+def write_preview(source, destination, size=320, format='webp', quality=75):
+    image = first_page(source, size)
+    image.thumbnail((size, size))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(destination))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format=format.upper(), quality=quality)
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,69 @@
+import csv
+import json
+import os
+from datetime import date, datetime
+from itertools import chain, islice
+
+RECORD_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+FLUSH_SIZE = 64 * 1024
+
+
+class Line:
+    # csv.writer target that hands each formatted row back instead of writing it
+    def write(self, value):
+        return value
+
+
+def record_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension)
+
+
+def read_records(stream, fmt):
+    # Yields (line number, record); a JSONL line that does not parse comes back as None
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {key: value for key, value in record.items() if key and value not in ('', None)}
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def write_records(records, fmt, fields):
+    # Generator of text chunks of about FLUSH_SIZE, so a response or file never holds more than one
+    if fmt == 'csv':
+        writer = csv.writer(Line())
+        lines = chain([writer.writerow(fields)], (writer.writerow([
+            json.dumps(value) if isinstance(value, (dict, list)) else plain(value)
+            for value in (record.get(field) for field in fields)
+        ]) for record in records))
+    else:
+        lines = (json.dumps({field: plain(record.get(field)) for field in fields}) + '\n' for record in records)
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,204 @@
+import os
+import re
+import secrets
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+# Exactly what secrets.token_urlsafe(32) produces; anything else never reaches a store
+SID_PATTERN = re.compile(r'[A-Za-z0-9_-]{43}')
+
+
+def valid_sid(sid):
+    return isinstance(sid, str) and SID_PATTERN.fullmatch(sid) is not None
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = new
+        self.modified = False
+
+
+class FileSystemSessionStore:
+    # Each file is an 8-byte expiry timestamp followed by the serialized session
+    header = struct.Struct('>d')
+    temp_max_age = 3600  # seconds before a leftover temp file from a crashed write is swept
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, sid):
+        # The id names a file, so one like ../uploads/x must never get this far
+        if not valid_sid(sid):
+            raise ValueError('invalid session id')
+        return os.path.join(self.directory, sid)
+
+    def get(self, sid):
+        try:
+            with open(self.path(sid), 'rb') as f:
+                raw = f.read()
+        except (OSError, ValueError):
+            return None
+        if len(raw) < self.header.size:
+            return None
+        expires, = self.header.unpack_from(raw)
+        if expires < time.time():
+            return None
+        return raw[self.header.size:], expires
+
+    def set(self, sid, data, expires):
+        path = self.path(sid)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.header.pack(expires) + data)
+        os.replace(temp_path, path)
+
+    def delete(self, sid):
+        try:
+            os.remove(self.path(sid))
+        except (OSError, ValueError):
+            pass
+
+    def sweep(self):
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.tmp'):
+                    # set() may still be writing it
+                    if entry.stat().st_mtime < now - self.temp_max_age:
+                        os.remove(entry.path)
+                        removed += 1
+                    continue
+                with open(entry.path, 'rb') as f:
+                    head = f.read(self.header.size)
+                if len(head) < self.header.size or self.header.unpack(head)[0] < now:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+class SQLiteSessionStore:
+    # One shared file, so every worker (or host on a shared volume) sees the same sessions
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS session (id TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_session_expires ON session (expires)')
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self.connect().execute(
+            'SELECT data, expires FROM session WHERE id = ? AND expires >= ?', (sid, time.time())
+        ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def set(self, sid, data, expires):
+        with self.connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO session (id, data, expires) VALUES (?, ?, ?)', (sid, data, expires))
+
+    def delete(self, sid):
+        with self.connect() as conn:
+            conn.execute('DELETE FROM session WHERE id = ?', (sid,))
+
+    def sweep(self):
+        with self.connect() as conn:
+            return conn.execute('DELETE FROM session WHERE expires < ?', (time.time(),)).rowcount
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, sweep_interval=300):
+        self.store = store
+        self.sweep_interval = sweep_interval
+        self.sweeper_pid = None
+        self.lock = threading.Lock()
+
+    def start_sweeper(self):
+        # Started lazily so each forked worker gets its own thread
+        with self.lock:
+            if self.sweeper_pid == os.getpid() or not self.sweep_interval:
+                return
+            self.sweeper_pid = os.getpid()
+
+        def sweep_forever():
+            while True:
+                time.sleep(self.sweep_interval)
+                try:
+                    self.store.sweep()
+                except Exception:
+                    pass
+
+        threading.Thread(target=sweep_forever, name='session-sweeper', daemon=True).start()
+
+    def regenerate(self, session):
+        # Same data under a new id, so an id planted before login is useless afterwards
+        self.store.delete(session.sid)
+        session.sid = secrets.token_urlsafe(32)
+        session.modified = True
+
+    def open_session(self, app, request):
+        self.start_sweeper()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if valid_sid(sid):
+            stored = self.store.get(sid)
+            if stored is not None:
+                data, expires = stored
+                return ServerSideSession(self.serializer.loads(data.decode()), sid=sid, expires=expires)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if not session.new and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        # Unchanged sessions are only rewritten once half their lifetime has passed
+        ttl = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        if not session.modified and session.expires and session.expires - now > ttl / 2:
+            return
+
+        self.store.set(session.sid, self.serializer.dumps(dict(session)).encode(), now + ttl)
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
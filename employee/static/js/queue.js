@@ -0,0 +1,97 @@
+// Appends the next keyset page of a review queue and applies live updates without reloading the dashboard
+(function () {
+    var badgeClasses = {
+        officer_approved: 'bg-info',
+        officer_rejected: 'bg-danger',
+        head_approved: 'bg-success',
+        head_rejected: 'bg-danger'
+    };
+
+    function renderRow(template, letter) {
+        var row = template.content.cloneNode(true);
+        row.querySelector('tr').dataset.letterId = letter.id;
+        row.querySelectorAll('[data-field]').forEach(function (el) {
+            el.textContent = letter[el.dataset.field] || '-';
+        });
+        row.querySelectorAll('[data-href]').forEach(function (el) {
+            el.href = letter[el.dataset.href];
+        });
+        row.querySelectorAll('[data-value]').forEach(function (el) {
+            el.value = letter[el.dataset.value];
+        });
+        row.querySelectorAll('[data-review]').forEach(function (el) {
+            el.dataset.reviewUrl = letter[el.dataset.review];
+            el.dataset.title = letter.title;
+            el.dataset.author = letter.author;
+        });
+        row.querySelectorAll('[data-status-badge]').forEach(function (el) {
+            el.classList.add(badgeClasses[letter.status] || 'bg-secondary');
+        });
+        return row;
+    }
+
+    document.addEventListener('click', function (event) {
+        var button = event.target.closest('[data-queue-url]');
+        if (!button) {
+            return;
+        }
+        event.preventDefault();
+        var table = document.getElementById(button.dataset.queueTable);
+        var template = table.querySelector('template');
+        var tbody = table.querySelector('tbody');
+        button.classList.add('disabled');
+
+        fetch(button.dataset.queueUrl + '?cursor=' + encodeURIComponent(button.dataset.cursor), {
+            headers: {'Accept': 'application/json'},
+            credentials: 'same-origin'
+        })
+            .then(function (response) { return response.json(); })
+            .then(function (page) {
+                page.letters.forEach(function (letter) {
+                    tbody.appendChild(renderRow(template, letter));
+                });
+                if (page.next_cursor) {
+                    button.dataset.cursor = page.next_cursor;
+                    button.classList.remove('disabled');
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(function () {
+                window.location = button.href;
+            });
+    });
+
+    // Live updates: drop the row a change affects and insert the server-rendered one where it now belongs
+    function insertRow(queue, html) {
+        var table = document.querySelector('table[data-queue="' + queue + '"]');
+        if (!table) {
+            window.location.reload();  // the queue was empty, so its table was never rendered
+            return;
+        }
+        table.querySelector('tbody').insertAdjacentHTML('afterbegin', html);
+    }
+
+    var stream = document.querySelector('[data-event-stream]');
+    if (stream && window.EventSource) {
+        var source = new EventSource(stream.dataset.eventStream);
+        source.addEventListener('letter', function (event) {
+            var update = JSON.parse(event.data);
+            document.querySelectorAll('tr[data-letter-id="' + update.id + '"]').forEach(function (row) {
+                row.remove();
+            });
+            if (update.queue) {
+                insertRow(update.queue, update.html);
+            }
+        });
+        source.addEventListener('user', function (event) {
+            var update = JSON.parse(event.data);
+            document.querySelectorAll('tr[data-user-id="' + update.id + '"]').forEach(function (row) {
+                row.remove();
+            });
+            if (update.html) {
+                insertRow('pending_users', update.html);
+            }
+        });
+    }
+})();
@@ -0,0 +1,15 @@
+// Fills the shared approve/reject dialogs from the button that opened them
+(function () {
+    document.querySelectorAll('[data-review-modal]').forEach(function (modal) {
+        modal.addEventListener('show.bs.modal', function (event) {
+            var button = event.relatedTarget;
+            modal.querySelector('form').action = button.dataset.reviewUrl;
+            modal.querySelectorAll('[data-modal-field]').forEach(function (el) {
+                el.textContent = button.dataset[el.dataset.modalField];
+            });
+            modal.querySelectorAll('textarea').forEach(function (el) {
+                el.value = '';
+            });
+        });
+    });
+})();
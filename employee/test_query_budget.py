@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, reconcile_letter_stats, User, Letter
+
+STATUSES = ['submitted', 'officer_approved', 'officer_rejected', 'head_approved', 'head_rejected']
+
+
+def seed(app, letters):
+    with app.app_context():
+        head = User(username='head', full_name='Head', designation='Head', role='head', approved=True, profile_complete=True)
+        officer = User(username='officer', full_name='Officer', designation='Officer', role='officer', approved=True,
+                       profile_complete=True)
+        author = User(username='author', full_name='Author', designation='Clerk', role='user', approved=True, fir_receipt='fir.pdf')
+        for user in (head, officer, author):
+            user.set_password('pw')
+        db.session.add_all([head, officer, author])
+        db.session.commit()
+        now = datetime.utcnow()
+        for i in range(letters):
+            status = STATUSES[i % len(STATUSES)]
+            created_at = now - timedelta(minutes=i)
+            db.session.add(Letter(
+                user_id=author.id, title='Leave Application', content='', template='leave',
+                template_params={'full_name': author.full_name, 'designation': author.designation},
+                status=status, created_at=created_at, updated_at=created_at,
+                officer_id=officer.id if status != 'submitted' else None,
+                head_id=head.id if status.startswith('head_') else None,
+            ))
+        db.session.commit()
+        reconcile_letter_stats()
+
+
+def client_for(app, username):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': 'pw'})
+    assert response.status_code == 302
+    return client
+
+
+# The statement count must not grow with the number of letters in the queues
+@pytest.mark.parametrize('letters', [10, 200])
+@pytest.mark.parametrize('username, url', [('officer', '/officer/dashboard'), ('head', '/head/dashboard')])
+def test_dashboard_query_budget(app, letters, username, url):
+    seed(app, letters)
+    response = client_for(app, username).get(url)
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) <= app.config['QUERY_BUDGET']
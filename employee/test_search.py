@@ -0,0 +1,50 @@
+import pytest
+
+from app import db, search_letters, submit_letter, User
+
+
+def add_user(username, role, full_name=None):
+    user = User(username=username, full_name=full_name or username.title(), designation='Clerk', role=role, approved=True,
+                profile_complete=True, fir_receipt='fir.pdf')
+    user.set_password('pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def letters(app):
+    with app.app_context():
+        add_user('head', 'head')
+        add_user('officer', 'officer')
+        author = add_user('author', 'user', 'Zebulon Quartz')
+        add_user('other', 'user')
+        # Written the way the views write them, so template letters are searched as stored
+        return {letter_type: submit_letter(author, letter_type).id for letter_type in ('leave', 'noc')}
+
+
+def found(app, username, terms):
+    with app.app_context():
+        user = User.query.filter_by(username=username).one()
+        results, has_more = search_letters(terms, user)
+        return [row.id for row, snippet in results]
+
+
+def test_finds_words_from_the_rendered_body(app, letters):
+    assert sorted(found(app, 'head', 'Quartz')) == sorted(letters.values())
+    assert found(app, 'head', 'objection') == [letters['noc']]
+    assert found(app, 'head', 'nonexistentword') == []
+
+
+def test_only_returns_letters_the_user_may_view(app, letters):
+    assert sorted(found(app, 'officer', 'Quartz')) == sorted(letters.values())
+    assert sorted(found(app, 'author', 'Quartz')) == sorted(letters.values())
+    assert found(app, 'other', 'Quartz') == []
+
+
+def test_search_page_renders_highlights(app, letters):
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'head', 'password': 'pw'}).status_code == 302
+    response = client.get('/letters/search?q=Quartz')
+    assert response.status_code == 200
+    assert all('<mark>' in letter['snippet'] for letter in response.get_json()['letters'])
@@ -0,0 +1,49 @@
+import json
+import time
+
+import pytest
+
+from app import db, User
+from sessions import FileSystemSessionStore, valid_sid
+
+
+@pytest.fixture
+def head(app):
+    with app.app_context():
+        user = User(username='head', full_name='Head', designation='Head', role='head', approved=True, profile_complete=True)
+        user.set_password('pw')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def forged_session(path, user_id):
+    # Same layout the store writes: an 8-byte expiry, then the serialized session
+    path.write_bytes(FileSystemSessionStore.header.pack(time.time() + 3600) + json.dumps({'_user_id': str(user_id)}).encode())
+
+
+def test_path_traversal_sid_is_not_loaded(app, head, tmp_path):
+    forged_session(tmp_path / 'forged.pdf', head)
+    client = app.test_client()
+    client.set_cookie('session', '../forged.pdf')
+    response = client.get('/head/dashboard')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+
+def test_store_refuses_invalid_sids(tmp_path):
+    forged_session(tmp_path / 'forged.pdf', 1)
+    store = FileSystemSessionStore(str(tmp_path / 'sessions'))
+    assert store.get('../forged.pdf') is None
+    with pytest.raises(ValueError):
+        store.set('../forged.pdf', b'{}', time.time() + 60)
+    store.delete('../forged.pdf')
+    assert (tmp_path / 'forged.pdf').exists()
+
+
+def test_login_issues_a_valid_new_sid(app, head):
+    client = app.test_client()
+    client.set_cookie('session', '../forged.pdf')
+    response = client.post('/login', data={'username': 'head', 'password': 'pw'})
+    assert response.status_code == 302
+    assert valid_sid(client.get_cookie('session').value)
@@ -0,0 +1,100 @@
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_required, current_user
+from app import (LETTER_TYPES, User, announce_user, db, invalidate_user, redirect_based_on_role, render_letter,
+                 save_uploaded_file, submit_letter, user_letters)
+
+bp = Blueprint('user', __name__)
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@login_required
+def profile():
+    if request.method == 'POST':
+        id_proof = request.files.get('id_proof')
+        aadhar_proof = request.files.get('aadhar_proof')
+        fir_receipt = request.files.get('fir_receipt')
+        user = db.session.get(User, current_user.id)
+        
+        if id_proof:
+            user.id_proof = save_uploaded_file(id_proof)
+        if aadhar_proof:
+            user.aadhar_proof = save_uploaded_file(aadhar_proof)
+        if fir_receipt:
+            user.fir_receipt = save_uploaded_file(fir_receipt)
+        
+        announce_user(db.session, user)
+        db.session.commit()
+        invalidate_user(user.id)
+        flash('Documents uploaded successfully!')
+        return redirect(url_for('user.pending_approval'))
+    
+    return render_template('profile.html')
+
+@bp.route('/pending_approval')
+@login_required
+def pending_approval():
+    if current_user.approved:
+        return redirect_based_on_role(current_user)
+    return render_template('pending_approval.html')
+
+@bp.route('/home')
+@login_required
+def home():
+    if not current_user.approved:
+        return redirect(url_for('user.pending_approval'))
+    if not current_user.has_submitted_docs():
+        return redirect(url_for('user.profile'))
+    return render_template('home.html', letters=user_letters(current_user.id))
+
+@bp.route('/generate_letter/<letter_type>', methods=['GET', 'POST'])
+@login_required
+def generate_letter(letter_type):
+    if not current_user.approved:
+        return redirect(url_for('user.pending_approval'))
+    
+    if letter_type not in LETTER_TYPES:
+        flash('Invalid letter type')
+        return redirect(url_for('user.home'))
+    
+    params = {'full_name': current_user.full_name, 'designation': current_user.designation}
+    content = render_letter(letter_type, **params)
+    
+    if request.method == 'POST':
+        submit_letter(current_user, letter_type)
+        flash('Letter submitted for approval!')
+        return redirect(url_for('user.home'))
+    
+    # For GET request, show the letter preview
+    return render_template(
+        'generate_letter.html', 
+        letter={'title': LETTER_TYPES[letter_type], 'content': content},
+        letter_type=letter_type,
+        now=datetime.now()
+    )
+
+@bp.route('/do/profile', methods=['GET', 'POST'])
+@login_required
+def do_profile():
+    if current_user.role != 'do' or current_user.profile_complete:
+        return redirect_based_on_role(current_user)
+    
+    if request.method == 'POST':
+        department = request.form['department']
+        phone = request.form['phone']
+        id_proof = request.files['id_proof']
+        aadhar_proof = request.files['aadhar_proof']
+        
+        # Save files and update user
+        user = db.session.get(User, current_user.id)
+        user.department = department
+        user.phone = phone
+        user.id_proof = save_uploaded_file(id_proof)
+        user.aadhar_proof = save_uploaded_file(aadhar_proof)
+        user.profile_complete = True
+        
+        db.session.commit()
+        invalidate_user(user.id)
+        flash('Profile completed successfully!')
+        return redirect(url_for('do_dashboard'))
+    
+    return render_template('do_profile.html')